@@ -0,0 +1,73 @@
+"""
+Start-up latency benchmark for export.py.
+
+Measures, in fresh interpreters, how long `import export` and `export.py --help`
+take and checks that the heavy third-party packages are still imported lazily.
+Exits non-zero when a check fails or the median import time exceeds --max-ms,
+so it can guard start-up latency in CI:
+
+    python benchmarks/bench_import.py --runs 20 --max-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages export.py must not import until they are needed
+LAZY_MODULES = ("bs4", "canvasapi", "dateutil", "jsonpickle", "requests", "yaml")
+
+CHECK_LAZY = (
+    "import json, sys, export; "
+    f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+)
+
+
+def timeCommand(command, runs):
+    """Median wall time in milliseconds of running command in a fresh process."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export.py start-up time.")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per measurement (default: 10).")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median `import export` time exceeds this.")
+    args = parser.parse_args()
+
+    # Compile up front (even under PYTHONDONTWRITEBYTECODE) so no sample includes compiling export.py
+    subprocess.run([sys.executable, "-m", "compileall", "-q", "-l", REPO_ROOT], check=True)
+
+    baseline_ms = timeCommand([sys.executable, "-c", "pass"], args.runs)
+    import_ms = timeCommand([sys.executable, "-c", "import export"], args.runs)
+    help_ms = timeCommand([sys.executable, "export.py", "--help"], args.runs)
+
+    result = subprocess.run([sys.executable, "-c", CHECK_LAZY], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True)
+    eager = json.loads(result.stdout)
+
+    print(f"Interpreter start-up:   {baseline_ms:7.1f} ms")
+    print(f"import export:          {import_ms:7.1f} ms ({import_ms - baseline_ms:.1f} ms over start-up)")
+    print(f"export.py --help:       {help_ms:7.1f} ms")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at start-up instead of on first use: {', '.join(eager)}")
+        failed = True
+    if args.max_ms is not None and import_ms > args.max_ms:
+        print(f"FAIL: import export took {import_ms:.1f} ms, more than --max-ms {args.max_ms:.1f} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+from urllib.parse import urlparse
+
+
+def auth_headers(url, base_url, access_token):
+    """The Authorization header for url, which only Canvas itself gets; signed file storage URLs must not."""
+    if access_token and urlparse(url).netloc == urlparse(base_url).netloc:
+        return {"Authorization": f"Bearer {access_token}"}
+    return {}
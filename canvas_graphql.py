@@ -0,0 +1,245 @@
+import json
+
+# Queries for the optional GraphQL fetch backend. Each returns a whole course
+# level (assignments with their submissions, discussions with their entries and
+# replies, modules with their items) a page at a time; nested connections that
+# overflow their first page are continued with the follow-up queries below.
+
+SUBMISSION_FIELDS = """
+fragment SubmissionFields on Submission {
+  _id
+  grade
+  score
+  attempt
+  url
+  submittedAt
+  gradedAt
+  user { _id }
+  attachments { _id displayName url size updatedAt }
+  commentsConnection { nodes { _id comment createdAt author { _id name } } }
+}
+"""
+
+REPLY_FIELDS = """
+fragment ReplyFields on DiscussionEntry {
+  _id
+  message
+  createdAt
+  author { name }
+}
+"""
+
+ENTRY_FIELDS = REPLY_FIELDS + """
+fragment EntryFields on DiscussionEntry {
+  ...ReplyFields
+  discussionSubentriesConnection(first: 100) {
+    pageInfo { hasNextPage endCursor }
+    nodes { ...ReplyFields }
+  }
+}
+"""
+
+COURSE_ASSIGNMENTS_QUERY = """
+query CourseAssignments($courseId: ID!, $after: String) {
+  course(id: $courseId) {
+    assignmentsConnection(first: 50, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        _id
+        name
+        description
+        createdAt
+        dueAt
+        updatedAt
+        htmlUrl
+        pointsPossible
+        submissionsConnection(first: 100) {
+          pageInfo { hasNextPage endCursor }
+          nodes { ...SubmissionFields }
+        }
+      }
+    }
+  }
+}
+""" + SUBMISSION_FIELDS
+
+ASSIGNMENT_SUBMISSIONS_QUERY = """
+query AssignmentSubmissions($id: ID!, $after: String) {
+  assignment(id: $id) {
+    submissionsConnection(first: 100, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...SubmissionFields }
+    }
+  }
+}
+""" + SUBMISSION_FIELDS
+
+COURSE_DISCUSSIONS_QUERY = """
+query CourseDiscussions($courseId: ID!, $after: String) {
+  course(id: $courseId) {
+    discussionsConnection(first: 50, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        _id
+        title
+        message
+        createdAt
+        updatedAt
+        postedAt
+        lastReplyAt
+        isAnnouncement
+        author { name }
+        discussionEntriesConnection(first: 100, rootEntries: true) {
+          pageInfo { hasNextPage endCursor }
+          nodes { ...EntryFields }
+        }
+      }
+    }
+  }
+}
+""" + ENTRY_FIELDS
+
+DISCUSSION_ENTRIES_QUERY = """
+query DiscussionEntries($id: ID!, $after: String) {
+  legacyNode(_id: $id, type: Discussion) {
+    ... on Discussion {
+      discussionEntriesConnection(first: 100, after: $after, rootEntries: true) {
+        pageInfo { hasNextPage endCursor }
+        nodes { ...EntryFields }
+      }
+    }
+  }
+}
+""" + ENTRY_FIELDS
+
+ENTRY_REPLIES_QUERY = """
+query EntryReplies($id: ID!, $after: String) {
+  legacyNode(_id: $id, type: DiscussionEntry) {
+    ... on DiscussionEntry {
+      discussionSubentriesConnection(first: 100, after: $after) {
+        pageInfo { hasNextPage endCursor }
+        nodes { ...ReplyFields }
+      }
+    }
+  }
+}
+""" + REPLY_FIELDS
+
+COURSE_MODULES_QUERY = """
+query CourseModules($courseId: ID!, $after: String) {
+  course(id: $courseId) {
+    modulesConnection(first: 50, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        _id
+        name
+        position
+        moduleItems {
+          _id
+          url
+          content {
+            __typename
+            ... on Assignment { _id title: name }
+            ... on Page { _id title }
+            ... on File { _id title: displayName }
+            ... on Discussion { _id title }
+            ... on Quiz { _id title }
+            ... on ExternalUrl { title externalUrl: url }
+            ... on ExternalTool { title: name }
+            ... on ModuleExternalTool { externalUrl: url }
+            ... on SubHeader { title }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# GraphQL type names of module item content, mapped to the REST ModuleItem type
+MODULE_ITEM_TYPES = {
+    "Assignment": "Assignment",
+    "Page": "Page",
+    "File": "File",
+    "Discussion": "Discussion",
+    "Quiz": "Quiz",
+    "ExternalUrl": "ExternalUrl",
+    "ExternalTool": "ExternalTool",
+    "ModuleExternalTool": "ExternalTool",
+    "SubHeader": "SubHeader",
+}
+
+
+class GraphQLError(Exception):
+    """The GraphQL endpoint rejected a query or returned errors."""
+
+
+class CanvasGraphQL:
+    """
+    Fetches course trees through Canvas' GraphQL endpoint and returns them as
+    plain dicts. Every connection is paged to the end, so callers never see a
+    partial list; any error is raised as GraphQLError so the caller can fall
+    back to the REST API.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.queries = 0
+
+    def query(self, query, variables):
+        self.queries += 1
+        result = self.canvas.graphql(query, variables)
+        if not isinstance(result, dict) or result.get("errors"):
+            errors = result.get("errors") if isinstance(result, dict) else result
+            raise GraphQLError(json.dumps(errors)[:500])
+        return result.get("data") or {}
+
+    def _connection(self, query, variables, *path):
+        """Yield every node of the connection found at path in query's result, page by page."""
+        after = None
+        while True:
+            data = self.query(query, dict(variables, after=after))
+            for key in path:
+                data = (data or {}).get(key)
+            if data is None:
+                raise GraphQLError(f"no {'.'.join(path)} in response")
+
+            yield from data.get("nodes") or []
+
+            page_info = data.get("pageInfo") or {}
+            if not page_info.get("hasNextPage"):
+                return
+            after = page_info.get("endCursor")
+
+    def _complete(self, node, field, query, node_path):
+        """Replace a nested connection that has more pages with the full list of its nodes."""
+        connection = node.get(field) or {}
+        nodes = connection.get("nodes") or []
+        if (connection.get("pageInfo") or {}).get("hasNextPage"):
+            nodes = list(self._connection(query, {"id": node["_id"]}, *node_path, field))
+        node[field] = nodes
+        return nodes
+
+    def course_assignments(self, course_id):
+        """Assignments of a course, each with its complete "submissionsConnection" list."""
+        assignments = list(self._connection(COURSE_ASSIGNMENTS_QUERY, {"courseId": str(course_id)},
+                                            "course", "assignmentsConnection"))
+        for assignment in assignments:
+            self._complete(assignment, "submissionsConnection", ASSIGNMENT_SUBMISSIONS_QUERY, ("assignment",))
+        return assignments
+
+    def course_discussions(self, course_id):
+        """Discussions and announcements of a course with all root entries and their replies."""
+        discussions = list(self._connection(COURSE_DISCUSSIONS_QUERY, {"courseId": str(course_id)},
+                                            "course", "discussionsConnection"))
+        for discussion in discussions:
+            entries = self._complete(discussion, "discussionEntriesConnection", DISCUSSION_ENTRIES_QUERY, ("legacyNode",))
+            for entry in entries:
+                self._complete(entry, "discussionSubentriesConnection", ENTRY_REPLIES_QUERY, ("legacyNode",))
+        return discussions
+
+    def course_modules(self, course_id):
+        """Modules of a course with their items."""
+        modules = list(self._connection(COURSE_MODULES_QUERY, {"courseId": str(course_id)},
+                                        "course", "modulesConnection"))
+        return sorted(modules, key=lambda module: module.get("position") or 0)
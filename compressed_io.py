@@ -0,0 +1,81 @@
+import gzip
+import os
+import shutil
+
+# zstandard is optional; only --compress-json zstd needs it
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# File name suffix of each supported compression
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# gzip's default level 9 is several times slower for a few percent of size
+GZIP_LEVEL = 6
+
+
+def compressed_name(path, compression=None):
+    """The name path is stored under with compression (unchanged for None)."""
+    return path + SUFFIXES[compression] if compression else path
+
+
+def find_existing(path):
+    """The name path was actually stored under, compressed or not, or None if it does not exist."""
+    for candidate in [path] + [path + suffix for suffix in SUFFIXES.values()]:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _compression_of(path):
+    for compression, suffix in SUFFIXES.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def _open_binary(path, mode, compression):
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL) if "w" in mode else gzip.open(path, mode)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install the zstandard package to read or write it")
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+def open_text(path, mode="r"):
+    """Open path as UTF-8 text for reading ("r") or writing ("w"), (de)compressing by its suffix."""
+    compression = _compression_of(path)
+    if compression is None:
+        return open(path, mode, encoding="utf-8")
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=GZIP_LEVEL)
+    if zstandard is None:
+        raise RuntimeError(f"{path} is zstd-compressed; install the zstandard package to read or write it")
+    return zstandard.open(path, mode + "t", encoding="utf-8")
+
+
+def read_text(path):
+    with open_text(path, "r") as f:
+        return f.read()
+
+
+def write_text(path, text):
+    """Write text to path (compressed by its suffix) through a temporary file, so readers never see half a file."""
+    tmp_path = path + ".part"
+    with _open_binary(tmp_path, "wb", _compression_of(path)) as f:
+        f.write(text.encode("utf-8"))
+    os.replace(tmp_path, path)
+
+
+def compress_file(path, compression):
+    """Replace the uncompressed file at path with a compressed copy and return the new name."""
+    target = compressed_name(path, compression)
+    tmp_path = target + ".part"
+    with open(path, "rb") as source, _open_binary(tmp_path, "wb", compression) as f:
+        shutil.copyfileobj(source, f, 1024 * 1024)
+    os.replace(tmp_path, target)
+    os.remove(path)
+    return target
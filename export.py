@@ -1,4 +1,6 @@
 # built in
+import atexit
+import hashlib
 import json
 import os
 import itertools
@@ -6,16 +8,24 @@ import re
 import string
 import argparse
 import sys
+import threading
+import time
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 
 # external
-from bs4 import BeautifulSoup
-from canvasapi import Canvas
-from canvasapi.exceptions import ResourceDoesNotExist, Unauthorized, Forbidden, InvalidAccessToken, CanvasException
-from singlefile import download_page, override_chrome_path
-import dateutil.parser
-import jsonpickle
-import requests
-import yaml
+# bs4, canvasapi, dateutil, jsonpickle, requests and yaml are imported where
+# they are first used: together they make up most of the start-up time, which
+# --help, --merge and every batch worker would otherwise pay up front
+# (see benchmarks/bench_import.py).
+from canvas_auth import auth_headers
+from canvas_graphql import MODULE_ITEM_TYPES, CanvasGraphQL, GraphQLError
+from compressed_io import SUFFIXES, compressed_name, find_existing, read_text, write_text, zstandard
+from export_log import ExportLog, format_bytes
+from offline_html import OfflineRenderer
+from singlefile import AssetStore, download_page, override_chrome_path, set_asset_store, set_browser_pool, set_snapshot_compression
+from sqlite_export import SQLiteExporter
 
 # Canvas API Error Handling Utility
 class CanvasErrorHandler:
@@ -25,6 +35,9 @@ class CanvasErrorHandler:
         Handle Canvas API exceptions with appropriate messaging and classification.
         Returns (error_type, message)
         """
+        import requests
+        from canvasapi.exceptions import CanvasException, Forbidden, InvalidAccessToken, ResourceDoesNotExist, Unauthorized
+
         if isinstance(e, InvalidAccessToken):
             return "authentication", f"Invalid Canvas API token. Please check your credentials.yaml file."
         
@@ -45,6 +58,12 @@ class CanvasErrorHandler:
         
         elif isinstance(e, CanvasException):
             return "canvas_error", f"Canvas API error during {operation_description}: {str(e)}"
+
+        elif isinstance(e, CircuitOpen):
+            return "circuit_open", str(e)
+
+        elif isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return "network_error", f"Network error during {operation_description}: {str(e)}"
         
         else:
             return "unknown_error", f"Unexpected error during {operation_description}: {str(e)}"
@@ -54,16 +73,18 @@ class CanvasErrorHandler:
         """Log error messages with appropriate formatting"""
         if error_type == "student_limitation":
             if show_details:
-                print(f"    Note: {message}")
+                log.info(f"    Note: {message}")
         elif error_type == "not_found":
-            print(f"    Skipping: {message}")
-        elif error_type in ["authentication", "authorization", "canvas_error", "unknown_error"]:
-            print(f"    ERROR: {message}")
+            log.warning(f"    Skipping: {message}")
+        elif error_type == "circuit_open":
+            pass  # Reported once by the circuit breaker when it tripped
+        elif error_type in ["authentication", "authorization", "canvas_error", "network_error", "unknown_error"]:
+            log.error(f"    ERROR: {message}")
             if verbose:
                 import traceback
-                traceback.print_exc()
+                log.debug(traceback.format_exc().rstrip())
         else:
-            print(f"    {message}")
+            log.info(f"    {message}")
             
     @staticmethod
     def is_fatal_error(error_type):
@@ -86,7 +107,36 @@ class ExtractionStats:
         self.json_files_created = 0
         self.student_limitation_warnings = 0
         self.error_count = 0
-        
+        self._lock = threading.Lock()
+
+    def increment(self, counter, amount=1):
+        """Thread-safe counter update; download workers change the same counters concurrently."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def add(self, counters):
+        """Add the counters of another run (as returned by __getstate__) to this one."""
+        with self._lock:
+            for counter, value in counters.items():
+                if isinstance(value, int) and hasattr(self, counter):
+                    setattr(self, counter, getattr(self, counter) + value)
+
+    def items_processed(self):
+        """Total number of entities found or files saved, used for throughput reporting."""
+        return (self.assignments_found + self.submissions_found + self.announcements_found
+                + self.discussions_found + self.pages_found + self.modules_found + self.module_items_found
+                + self.files_downloaded + self.attachments_downloaded + self.html_pages_downloaded)
+
+    def __getstate__(self):
+        # Keep the lock out of pickled/JSON-encoded copies of the stats
+        state = self.__dict__.copy()
+        state.pop("_lock", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
     def summary(self, dl_location, singlefile_enabled=False):
         summary_text = f"""
 Data Extraction Summary:
@@ -120,8 +170,333 @@ Errors Encountered: {self.error_count}
 # Global stats tracker
 extraction_stats = ExtractionStats()
 
+
+class DownloadPipeline:
+    """
+    Producer/consumer queue for file transfers. Metadata stages submit download
+    jobs as soon as they discover them and a pool of transfer workers drains the
+    queue in the background, so API latency and byte transfer overlap.
+    """
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="download")
+        self.pending = []
+
+    def submit(self, job, *job_args):
+        stage = log.stage("downloads")
+        stage.add_total()
+        future = self.executor.submit(job, *job_args)
+        future.add_done_callback(lambda _: stage.advance())
+        self.pending.append(future)
+
+    def drain(self):
+        """Block until every queued job has finished."""
+        pending, self.pending = self.pending, []
+        wait(pending)
+        for future in pending:
+            # Jobs handle their own errors; anything left here is a bug worth seeing
+            if future.exception() is not None:
+                log.error(f"    ERROR: Download worker failed: {future.exception()}")
+                extraction_stats.increment("error_count")
+
+    def shutdown(self):
+        self.drain()
+        self.executor.shutdown()
+
+class AuthorizationCache:
+    """
+    Remembers, per course, which endpoint families this token is not allowed to
+    use (e.g. class-wide submissions or the course files listing) so later work
+    goes straight to the permitted path instead of re-probing. Optionally
+    persisted as JSON so the knowledge carries over between runs; a read_only
+    cache loads that file but never writes it. Entries expire after ttl seconds
+    so permissions granted later are noticed.
+    """
+    # Endpoint families tracked by the cache
+    CLASS_SUBMISSIONS = "class_submissions"
+    COURSE_FILES = "course_files"
+
+    # Permissions change (a student who becomes a TA), so refusals are re-checked after a week
+    TTL = 7 * 24 * 3600
+
+    def __init__(self, path=None, user_id=None, read_only=False, load=True, ttl=TTL):
+        self.path = path
+        self.user_id = user_id
+        self.read_only = read_only
+        self.ttl = ttl
+        self.forbidden = {}  # {course_id: {family: time recorded}}
+        self._lock = threading.Lock()
+
+        if load and path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                # A cache written for another account says nothing about this token
+                if data.get("user_id") == user_id:
+                    now = time.time()
+                    for course_id, families in data.get("forbidden", {}).items():
+                        # Caches written before entries were timestamped hold plain lists
+                        if isinstance(families, list):
+                            families = dict.fromkeys(families, now)
+                        fresh = {family: recorded for family, recorded in families.items() if now - recorded < ttl}
+                        if fresh:
+                            self.forbidden[course_id] = fresh
+            except (OSError, ValueError, AttributeError, TypeError):
+                self.forbidden = {}
+
+    def is_forbidden(self, course_id, family):
+        with self._lock:
+            recorded = self.forbidden.get(str(course_id), {}).get(family)
+        return recorded is not None and time.time() - recorded < self.ttl
+
+    def record_forbidden(self, course_id, family):
+        if self.is_forbidden(course_id, family):
+            return
+        with self._lock:
+            self.forbidden.setdefault(str(course_id), {})[family] = time.time()
+        self.save()
+
+    def save(self):
+        if not self.path or self.read_only:
+            return
+        with self._lock:
+            data = {
+                "user_id": self.user_id,
+                "forbidden": {course_id: dict(sorted(families.items())) for course_id, families in self.forbidden.items()},
+            }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+
+
+# In-memory until __main__ knows the output directory and user
+authorization_cache = AuthorizationCache()
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an endpoint family whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint family (e.g. module file lookups or file
+    downloads) after it failed threshold times in a row with the same class of
+    error, until cooldown seconds have passed. Each family and error class is
+    reported once when it trips, and the skipped calls are totalled at the end
+    instead of logging every failure.
+    """
+
+    def __init__(self, threshold=5, cooldown=300):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = {}
+        self.open_until = {}
+        self.skipped = {}
+        self.reported = set()
+        self._lock = threading.Lock()
+
+    def before_call(self, family):
+        """Raise CircuitOpen if calls to this family are currently suspended."""
+        now = time.monotonic()
+        with self._lock:
+            for (open_family, error_type), until in self.open_until.items():
+                if open_family == family and until > now:
+                    key = (family, error_type)
+                    self.skipped[key] = self.skipped.get(key, 0) + 1
+                    raise CircuitOpen(f"Skipping {family} after repeated {error_type} errors")
+
+    def record_success(self, family):
+        with self._lock:
+            for key in [key for key in self.failures if key[0] == family]:
+                del self.failures[key]
+                self.open_until.pop(key, None)
+
+    def record_failure(self, family, error_type):
+        key = (family, error_type)
+        with self._lock:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            if self.threshold <= 0 or self.failures[key] < self.threshold:
+                return
+            # Still failing after the cooldown trips the circuit again straight away
+            self.open_until[key] = time.monotonic() + self.cooldown
+            if key in self.reported:
+                return
+            self.reported.add(key)
+        log.warning(f"    ⚠ {self.threshold} {family} in a row failed with {error_type}; "
+              f"skipping {family} for {self.cooldown}s")
+
+    def summary(self):
+        with self._lock:
+            return [f"{family}: {count} calls skipped after repeated {error_type} errors"
+                    for (family, error_type), count in sorted(self.skipped.items())]
+
+
+# Reset for every account by configureAccount()
+circuit_breaker = CircuitBreaker()
+
+
+def guardedCall(family, call, *call_args, **call_kwargs):
+    """
+    Call an endpoint of the given family through the circuit breaker. Raises
+    CircuitOpen without calling it while the family is suspended.
+    """
+    circuit_breaker.before_call(family)
+    try:
+        result = call(*call_args, **call_kwargs)
+    except Exception as e:
+        error_type, _ = CanvasErrorHandler.handle_canvas_exception(e, family)
+        circuit_breaker.record_failure(family, error_type)
+        raise
+    circuit_breaker.record_success(family)
+    return result
+
+
+def guardedIter(family, iterable):
+    """
+    Like guardedCall() for a paginated listing, but yielding items as their
+    pages arrive: a failure fetching any page counts against the family, and
+    the listing succeeds once it has been read to the end.
+    """
+    circuit_breaker.before_call(family)
+    try:
+        yield from iterable
+    except Exception as e:
+        error_type, _ = CanvasErrorHandler.handle_canvas_exception(e, family)
+        circuit_breaker.record_failure(family, error_type)
+        raise
+    circuit_breaker.record_success(family)
+
+
+class ExportFilter:
+    """
+    Decides which courses and which parts of them are exported: content types
+    to include or exclude, course terms, and an updated-since cut-off for
+    entities that carry timestamps. Checks happen before anything is fetched.
+    With shard=(index, count), only the courses of that shard (1-based, by
+    course id) are selected.
+    """
+    # Stages that can be selected with --include / --exclude
+    CONTENT_TYPES = ("assignments", "attachments", "announcements", "discussions",
+                     "pages", "modules", "files", "html")
+
+    def __init__(self, include=None, exclude=None, terms=None, exclude_terms=None, updated_since=None, shard=None):
+        self.shard = shard
+        self.types = set(include or self.CONTENT_TYPES) - set(exclude or ())
+        self.terms = {term.casefold() for term in terms or ()}
+        self.exclude_terms = {term.casefold() for term in exclude_terms or ()}
+        self.updated_since = parseTimestamp(updated_since) if updated_since else None
+        if self.updated_since is not None and self.updated_since.tzinfo is None:
+            self.updated_since = self.updated_since.replace(tzinfo=timezone.utc)
+
+    def wants(self, content_type):
+        return content_type in self.types
+
+    def wants_course(self, course):
+        if self.shard is not None and courseShard(course.id, self.shard[1]) != self.shard[0]:
+            return False
+
+        term = courseTermName(course).casefold()
+        if self.terms and term not in self.terms:
+            return False
+        return term not in self.exclude_terms
+
+    def is_recent(self, *timestamps):
+        """
+        True if any of the given Canvas timestamps is at or after the cut-off.
+        Entities without any timestamp are kept, since their age is unknown.
+        """
+        if self.updated_since is None:
+            return True
+
+        known = False
+        for timestamp in timestamps:
+            if not timestamp:
+                continue
+            try:
+                moment = parseTimestamp(str(timestamp))
+            except (ValueError, TypeError, OverflowError):
+                continue
+            known = True
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            if moment >= self.updated_since:
+                return True
+        return not known
+
+
+def courseShard(course_id, shard_count):
+    """The 1-based shard a course belongs to; depends only on its id, so every machine agrees."""
+    return int(course_id) % shard_count + 1
+
+
+def parseShard(value):
+    """Parse an "i/N" shard specification into (i, N)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"expected i/N, got '{value}'")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard {value} is out of range; use 1/N … N/N")
+    return index, count
+
+
+def shardDirectoryName(shard):
+    return f"shard-{shard[0]}-of-{shard[1]}"
+
+
+def courseTermName(course):
+    """The name of a course's term; canvasapi leaves the included term as a plain dict."""
+    term = getattr(course, "term", None)
+    if isinstance(term, dict):
+        return str(term.get("name") or "")
+    return str(getattr(term, "name", "") or "")
+
+
+# Everything is exported until configureAccount() applies the command line filters
+export_filter = ExportFilter()
+
+
+def iterPaginated(paginated_list):
+    """
+    Iterate a canvasapi PaginatedList while the next page is requested in the
+    background, so processing one page overlaps with fetching the next. Pages
+    are not appended to the list, so only the pages in flight are held in
+    memory; the list cannot be iterated again afterwards.
+    """
+    from canvasapi.paginated_list import PaginatedList
+
+    if not isinstance(paginated_list, PaginatedList):
+        yield from paginated_list
+        return
+
+    # Ask for the largest page Canvas allows unless the listing has already started.
+    # Set here rather than as a per_page argument, which canvasapi would send twice.
+    if not paginated_list._elements and paginated_list._next_params is paginated_list._first_params:
+        paginated_list._first_params["per_page"] = PAGE_SIZE
+
+    # Pages that were already loaded (e.g. by indexing) come first
+    yield from list(paginated_list._elements)
+
+    if not paginated_list._has_next():
+        return
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") as executor:
+        next_page = executor.submit(paginated_list._get_next_page)
+        while next_page is not None:
+            page = next_page.result()
+            next_page = executor.submit(paginated_list._get_next_page) if paginated_list._has_next() else None
+            yield from page
+
+
+def parseTimestamp(timestamp):
+    """dateutil.parser.parse, importing dateutil on first use."""
+    import dateutil.parser
+
+    return dateutil.parser.parse(timestamp)
+
+
 def _load_credentials(path: str) -> dict:
     """Return a dict with API_URL, API_KEY, USER_ID, COOKIES_PATH or empty dict if file missing."""
+    import yaml
+
     try:
         with open(path, "r", encoding="utf-8") as f:
             return yaml.full_load(f) or {}
@@ -150,6 +525,41 @@ MAX_FOLDER_NAME_SIZE = 70
 # Global flag to stop HTML downloads if cookies are invalid
 stop_html_downloads = False
 
+# Canvas caps per_page at 100 for its listing endpoints
+PAGE_SIZE = 100
+
+# Optional SQLite output (see --sqlite); None when disabled
+sqlite_exporter = None
+
+# Optional newline-delimited JSON entity stream (see --ndjson); None when disabled
+ndjson_stream = None
+
+# Background transfer workers (see --download-workers); created in __main__
+download_pipeline = None
+
+# Pooled HTTP session used for attachment downloads. Created once per process
+# (by _batchWorkerInit in batch mode, else on first use in exportAccount) so
+# every account exported by the process reuses its connections.
+http_session = None
+
+
+def createHttpSession(pool_size):
+    import requests
+
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max(10, pool_size)))
+    return session
+
+# Console and --log-file output with per-stage progress; replaced in configureAccount
+log = ExportLog()
+atexit.register(lambda: log.close())
+
+# Client for the GraphQL fetch backend (--backend graphql); None fetches over REST only
+graphql_client = None
+
+# Browserless renderer for pages whose content the API already returned (--offline-html)
+offline_renderer = None
+
 
 class moduleItemView():
     id = 0
@@ -174,6 +584,7 @@ class moduleView():
 class pageView():
     id = 0
 
+    url = ""
     title = ""
     body = ""
     created_date = ""
@@ -238,6 +649,8 @@ class attachmentView():
 
     filename = ""
     url = ""
+    size = None
+    updated_at = ""
 
 class assignmentView():
     id = 0
@@ -266,12 +679,304 @@ class courseView():
     announcements = []
     discussions = []
     modules = []
+    pages = []
 
     def __init__(self):
         self.assignments = []
         self.announcements = []
         self.discussions = []
         self.modules = []
+        self.pages = []
+
+class OutputIndex:
+    """
+    Snapshot of the files and directories below one course output folder, taken
+    with a single directory scan. Skip decisions and directory creation consult
+    the snapshot instead of issuing a stat call per file.
+    """
+    def __init__(self, root):
+        self.root = os.path.normpath(root)
+        self.files = set()
+        self.dirs = set()
+        self._lock = threading.Lock()
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirpath = os.path.normpath(dirpath)
+            self.dirs.add(dirpath)
+            for filename in filenames:
+                self.files.add(os.path.join(dirpath, filename))
+
+    def covers(self, path):
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def exists(self, path):
+        with self._lock:
+            return path in self.files or path in self.dirs
+
+    def add_file(self, path):
+        with self._lock:
+            self.files.add(path)
+
+    def add_dir(self, path):
+        with self._lock:
+            # Record the directory and every parent up to the indexed root
+            while self.covers(path) and path not in self.dirs:
+                self.dirs.add(path)
+                path = os.path.dirname(path)
+
+
+# Index of the course currently being exported; replaced at the start of each course
+output_index = None
+
+
+class DownloadManifest:
+    """
+    Records size, Canvas updated_at and a SHA-256 content hash for every
+    downloaded file (in <output>/.download_manifest.json). Reruns compare the
+    recorded size and updated_at with Canvas metadata to spot truncated or
+    outdated files without reading them back; hashing happens on a background
+    worker pool after each download.
+    """
+    def __init__(self, root, hash_workers=2):
+        self.root = root
+        self.path = os.path.join(root, ".download_manifest.json")
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._hasher = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="hash")
+        self._pending = []
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _key(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def is_current(self, path, size=None, updated_at=None):
+        """True if the file at path still matches what Canvas reports for it."""
+        with self._lock:
+            entry = self.entries.get(self._key(path))
+
+        if entry is None:
+            # Downloaded before the manifest existed: adopt it if its size is plausible
+            try:
+                on_disk = os.path.getsize(path)
+            except OSError:
+                return False
+            if (size is not None and on_disk != size) or (size is None and on_disk == 0):
+                return False
+            self.record(path, on_disk, updated_at)
+            return True
+
+        if size is not None and entry.get("size") != size:
+            return False
+        if updated_at and entry.get("updated_at") and not self._same_time(entry["updated_at"], updated_at):
+            return False
+        return True
+
+    @staticmethod
+    def _same_time(recorded, reported):
+        # REST reports "...Z" and GraphQL "...+00:00" for the same instant
+        if recorded == reported:
+            return True
+        try:
+            return parseTimestamp(recorded) == parseTimestamp(reported)
+        except (ValueError, TypeError, OverflowError):
+            return False
+
+    def record(self, path, size, updated_at=None):
+        """Remember a completed download and hash it in the background."""
+        key = self._key(path)
+        with self._lock:
+            self.entries[key] = {"size": size, "updated_at": updated_at or "", "sha256": None}
+            self._pending = [future for future in self._pending if not future.done()]
+            self._pending.append(self._hasher.submit(self._hash, path, key, size))
+
+    def _hash(self, path, key, size):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        with self._lock:
+            entry = self.entries.get(key)
+            # Ignore the result if the file was replaced while we were hashing
+            if entry is not None and entry["size"] == size:
+                entry["sha256"] = digest.hexdigest()
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.entries, indent=1, sort_keys=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """Wait for outstanding hashes, then write the manifest."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+        self._hasher.shutdown()
+        self.save()
+
+
+# Manifest of downloaded files for the current account; created in exportAccount()
+download_manifest = None
+
+
+def needsDownload(path, size=None, updated_at=None):
+    """Decide whether path has to be (re)downloaded, given Canvas' size and updated_at for it."""
+    if not pathExists(path):
+        return True
+    if download_manifest is None:
+        return False
+    return not download_manifest.is_current(path, size, updated_at)
+
+
+def saveDownload(path, write, size=None, updated_at=None):
+    """
+    Run write(tmp_path) to fetch a file next to its destination, check it against
+    the size Canvas reported, then move it into place and record it in the
+    manifest. An interrupted transfer therefore never leaves a truncated file at path.
+    """
+    ensureDirectory(os.path.dirname(path))
+    tmp_path = path + ".part"
+    try:
+        write(tmp_path)
+        written = os.path.getsize(tmp_path)
+        if size is not None and written != size:
+            raise IOError(f"incomplete download ({written} of {size} bytes)")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    recordFile(path)
+    if download_manifest is not None:
+        download_manifest.record(path, written, updated_at)
+    log.stage("downloads").advance(0, written)
+
+def _fetchRange(url, tmp_path, start, end, attempts=3):
+    """Write bytes start..end (inclusive) of url into the preallocated tmp_path."""
+    import requests
+
+    for attempt in range(1, attempts + 1):
+        try:
+            written = 0
+            with http_session.get(url, headers={**auth_headers(url, API_URL, API_KEY), "Range": f"bytes={start}-{end}"}, stream=True) as r:
+                if r.status_code != 206:
+                    raise IOError(f"server answered {r.status_code} to a range request")
+                with open(tmp_path, "r+b") as f:
+                    f.seek(start)
+                    for block in r.iter_content(chunk_size=1024 * 1024):
+                        f.write(block)
+                        written += len(block)
+            if written != end - start + 1:
+                raise IOError(f"short range {start}-{end} ({written} bytes)")
+            return
+        except (IOError, requests.exceptions.RequestException):
+            if attempt == attempts:
+                raise
+
+
+def downloadChunked(url, tmp_path, size, fallback):
+    """
+    Fetch a large file as parallel byte ranges into tmp_path, preallocated to its
+    full size, and check every range arrived complete. Servers that do not
+    answer ranges (or report another size) get fallback(tmp_path) instead.
+    """
+    with http_session.get(url, headers={**auth_headers(url, API_URL, API_KEY), "Range": "bytes=0-0"}, stream=True) as probe:
+        # Canvas redirects to file storage; later ranges go straight to the final URL
+        ranged = probe.status_code == 206 and probe.headers.get("Content-Range", "").endswith(f"/{size}")
+        target_url = probe.url
+
+    if not ranged:
+        return fallback(tmp_path)
+
+    with open(tmp_path, "wb") as f:
+        f.truncate(size)
+
+    chunk_size = max(1, args.chunk_size_mb) * 1024 * 1024
+    ranges = [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+    with ThreadPoolExecutor(max_workers=max(1, args.chunk_workers), thread_name_prefix="chunk") as executor:
+        for future in [executor.submit(_fetchRange, target_url, tmp_path, start, end) for start, end in ranges]:
+            future.result()
+
+    if os.path.getsize(tmp_path) != size:
+        raise IOError(f"chunked download has {os.path.getsize(tmp_path)} of {size} bytes")
+
+
+def downloadWriter(url, size, fallback):
+    """
+    The saveDownload writer for a file: parallel ranges when it is at least
+    --chunked-download-mb large, otherwise the regular single-stream fallback.
+    """
+    threshold = args.chunked_download_mb * 1024 * 1024
+    if url and size and threshold > 0 and size >= threshold:
+        return lambda tmp_path: downloadChunked(url, tmp_path, size, fallback)
+    return fallback
+
+
+# File metadata (id -> canvasapi File) from the current course's files listing,
+# so module File items can be resolved without a get_file request each
+course_file_index = {}
+
+# Wiki page url (slug) behind each Page module item of the current course
+module_page_index = {}
+
+
+def pathExists(path):
+    """os.path.exists that answers from the current course's OutputIndex when possible."""
+    path = os.path.normpath(path)
+    if output_index is not None and output_index.covers(path):
+        return output_index.exists(path)
+    return os.path.exists(path)
+
+
+def ensureDirectory(path):
+    """Create path (and parents) unless the current OutputIndex already knows it exists."""
+    path = os.path.normpath(path)
+    if output_index is not None and output_index.covers(path):
+        if not output_index.exists(path):
+            os.makedirs(path, exist_ok=True)
+            output_index.add_dir(path)
+    else:
+        os.makedirs(path, exist_ok=True)
+
+
+def recordFile(path):
+    """Tell the current OutputIndex about a file that was just written."""
+    path = os.path.normpath(path)
+    if output_index is not None and output_index.covers(path):
+        output_index.add_file(path)
+
+
+def existingOutput(path):
+    """The name an output file exists under, compressed or not, or None if it has not been written."""
+    for candidate in [path] + [path + suffix for suffix in SUFFIXES.values()]:
+        if pathExists(candidate):
+            return candidate
+    return None
+
+
+def snapshotCompression():
+    return "gzip" if args.compress_html else None
+
+
+def writeJSONOutput(path, json_str):
+    """
+    Write a JSON export to path, compressed according to --compress-json, and
+    remove copies of it left under another compression. Returns the name written.
+    """
+    output_path = compressed_name(path, args.compress_json)
+    write_text(output_path, json_str)
+    for stale_path in [path] + [path + suffix for suffix in SUFFIXES.values()]:
+        if stale_path != output_path and os.path.exists(stale_path):
+            os.remove(stale_path)
+    return output_path
+
 
 def makeValidFilename(input_str):
     if(not input_str):
@@ -323,26 +1028,66 @@ def shortenFileName(string, shorten_by) -> str:
     return string
 
 
+def emitRecord(record_type, course, view, exclude=(), **keys):
+    """
+    Write a single NDJSON record for a freshly built view when --ndjson is enabled.
+    Nested child lists named in exclude are dropped because they are emitted as
+    records of their own.
+    """
+    import jsonpickle
+
+    if ndjson_stream is None:
+        return
+
+    data = json.loads(jsonpickle.encode(view, unpicklable=False))
+    for key in exclude:
+        data.pop(key, None)
+
+    record = {
+        "type": record_type,
+        "course_id": course.id if hasattr(course, "id") else 0,
+        "term": makeValidFilename(courseTermName(course)),
+    }
+    record.update(keys)
+    record["data"] = data
+
+    ndjson_stream.write(json.dumps(record) + "\n")
+    ndjson_stream.flush()
+
+
+def getModuleItems(module):
+    """
+    Iterate a module's items, preferring the list Canvas returned inline with
+    the module listing. Canvas leaves the inline list out (or short) for large
+    modules, and only those are paged through individually, page by page.
+    """
+    from canvasapi.module import ModuleItem
+
+    inline_items = getattr(module, "items", None)
+    items_count = getattr(module, "items_count", None)
+
+    if isinstance(inline_items, list) and (items_count is None or len(inline_items) >= items_count):
+        course_id = getattr(module, "course_id", None)
+        return (ModuleItem(module._requester, dict(item, course_id=course_id)) for item in inline_items)
+
+    return iterPaginated(module.get_module_items())
+
+
 def findCourseModules(course, course_view):
     modules_dir = os.path.join(DL_LOCATION, course_view.term,
                                course_view.course_code, "modules")
 
     # Create modules directory if not present
-    if not os.path.exists(modules_dir):
-        os.makedirs(modules_dir)
+    ensureDirectory(modules_dir)
 
     module_views = []
 
     try:
-        modules = course.get_modules()
-        modules_list = list(modules)  # Convert to list to get count
-        
-        if not modules_list:
-            print("    No modules found in this course")
-        else:
-            print(f"    Found {len(modules_list)} modules")
+        # Ask for module items inline so most modules need no request of their own
+        modules = course.get_modules(include=["items"])
 
-        for module in modules_list:
+        # Modules are processed as their pages arrive and counted once all are in
+        for module in iterPaginated(modules):
             module_view = moduleView()
 
             # ID
@@ -350,17 +1095,10 @@ def findCourseModules(course, course_view):
 
             # Name
             module_view.name = str(module.name) if hasattr(module, "name") else ""
-            print(f"      Processing module: {module_view.name}")
+            log.debug(f"      Processing module: {module_view.name}")
 
             try:
-                # Get module items
-                module_items = module.get_module_items()
-                module_items_list = list(module_items)
-                
-                if module_items_list:
-                    print(f"        Found {len(module_items_list)} items")
-                
-                for module_item in module_items_list:
+                for module_item in getModuleItems(module):
                     module_item_view = moduleItemView()
 
                     # ID
@@ -376,159 +1114,233 @@ def findCourseModules(course, course_view):
                     # External URL
                     module_item_view.external_url = str(module_item.external_url) if hasattr(module_item, "external_url") else ""
 
-                    if module_item_view.content_type == "File":
-                        # If problems arise due to long pathnames, changing module.name to module.id might help
-                        # A change would also have to be made in downloadCourseModulePages(api_url, course_view, cookies_path)
-                        module_name = makeValidFilename(str(module.name))
-                        module_name = shortenFileName(module_name, len(module_name) - MAX_FOLDER_NAME_SIZE)
-                        module_dir = os.path.join(modules_dir, module_name, "files")
-
-                        try:
-                            # Create directory for current module if not present
-                            if not os.path.exists(module_dir):
-                                os.makedirs(module_dir)
-
-                            # Get the file object
-                            module_file = course.get_file(str(module_item.content_id))
-
-                            # Create path for module file download
-                            module_file_path = os.path.join(module_dir, makeValidFilename(str(module_file.display_name)))
-
-                            # Download file if it doesn't already exist
-                            if not os.path.exists(module_file_path):
-                                module_file.download(module_file_path)
-                                extraction_stats.files_downloaded += 1
-                                print(f"        Downloaded: {module_file.display_name}")
-                            else:
-                                print(f"        File already exists: {module_file.display_name}")
-                        except Exception as e:
-                            error_type, message = CanvasErrorHandler.handle_canvas_exception(
-                                e, "module file download"
-                            )
-                            if error_type == "student_limitation":
-                                extraction_stats.student_limitation_warnings += 1
-                            elif error_type == "not_found":
-                                pass  # Already handled by log_error
-                            else:
-                                extraction_stats.error_count += 1
-                            CanvasErrorHandler.log_error(error_type, message)
+                    if module_item_view.content_type == "File" and export_filter.wants("files"):
+                        queueModuleFile(course, modules_dir, module_view.name, module_item.content_id)
+                    elif module_item_view.content_type == "Page" and hasattr(module_item, "page_url"):
+                        module_page_index[module_item_view.id] = str(module_item.page_url)
 
                     module_view.items.append(module_item_view)
-                    extraction_stats.module_items_found += 1
+                    emitRecord("module_item", course, module_item_view, module_id=module_view.id)
+                    extraction_stats.increment("module_items_found")
             except Exception as e:
                 error_type, message = CanvasErrorHandler.handle_canvas_exception(
                     e, "module item processing"
                 )
                 CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-                extraction_stats.error_count += 1
+                extraction_stats.increment("error_count")
+
+            if module_view.items:
+                log.debug(f"        Found {len(module_view.items)} items")
 
             module_views.append(module_view)
-            extraction_stats.modules_found += 1
+            extraction_stats.increment("modules_found")
+            log.stage("modules").advance()
 
     except Exception as e:
         error_type, message = CanvasErrorHandler.handle_canvas_exception(
             e, "module processing"
         )
         CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-        extraction_stats.error_count += 1
+        extraction_stats.increment("error_count")
+
+    if not module_views:
+        log.info("    No modules found in this course")
+    else:
+        log.info(f"    Found {len(module_views)} modules")
 
     return module_views
 
 
+def queueModuleFile(course, modules_dir, module_name, content_id):
+    """Look up the File behind a module item and queue it for download into the module's folder."""
+    # If problems arise due to long pathnames, changing module.name to module.id might help
+    # A change would also have to be made in downloadCourseModulePages(api_url, course_view, cookies_path)
+    module_name = makeValidFilename(str(module_name))
+    module_name = shortenFileName(module_name, len(module_name) - MAX_FOLDER_NAME_SIZE)
+    module_dir = os.path.join(modules_dir, module_name, "files")
+
+    try:
+        # Get the file object, reusing the course files listing when it included this file
+        module_file = course_file_index.get(content_id)
+        if module_file is None:
+            module_file = guardedCall("module file lookups", course.get_file, str(content_id))
+
+        # Create path for module file download
+        module_file_path = os.path.join(module_dir, makeValidFilename(str(module_file.display_name)))
+
+        # Hand the transfer to the download workers
+        download_pipeline.submit(_downloadModuleFile, module_file, module_file_path)
+    except Exception as e:
+        error_type, message = CanvasErrorHandler.handle_canvas_exception(
+            e, "module file download"
+        )
+        if error_type == "student_limitation":
+            extraction_stats.increment("student_limitation_warnings")
+        elif error_type in ("not_found", "circuit_open"):
+            pass  # Already handled by log_error
+        else:
+            extraction_stats.increment("error_count")
+        CanvasErrorHandler.log_error(error_type, message)
+
+
+def _downloadModuleFile(module_file, module_file_path):
+    """Download worker job for a module File item."""
+    try:
+        # Download file unless an up-to-date copy already exists
+        if needsDownload(module_file_path, getattr(module_file, "size", None), getattr(module_file, "updated_at", None)):
+            module_file_size = getattr(module_file, "size", None)
+            guardedCall("file downloads", saveDownload, module_file_path,
+                        downloadWriter(getattr(module_file, "url", None), module_file_size, module_file.download),
+                        module_file_size, getattr(module_file, "updated_at", None))
+            extraction_stats.increment("files_downloaded")
+            log.debug(f"        Downloaded: {module_file.display_name}")
+        else:
+            log.debug(f"        File already exists: {module_file.display_name}")
+    except Exception as e:
+        error_type, message = CanvasErrorHandler.handle_canvas_exception(
+            e, "module file download"
+        )
+        if error_type == "student_limitation":
+            extraction_stats.increment("student_limitation_warnings")
+        elif error_type not in ("not_found", "circuit_open"):
+            extraction_stats.increment("error_count")
+        CanvasErrorHandler.log_error(error_type, message)
+
+
+def _downloadCourseFile(file, dl_path):
+    """Download worker job for a file from the course files listing."""
+    log.debug(f"    Downloading: {file.display_name}...")
+    if needsDownload(dl_path, getattr(file, "size", None), getattr(file, "updated_at", None)):
+        try:
+            guardedCall("file downloads", saveDownload, dl_path,
+                        downloadWriter(getattr(file, "url", None), getattr(file, "size", None), file.download),
+                        getattr(file, "size", None), getattr(file, "updated_at", None))
+            extraction_stats.increment("files_downloaded")
+            log.debug(f"      ✓ Saved: {file.display_name}")
+        except Exception as e:
+            error_type, message = CanvasErrorHandler.handle_canvas_exception(e, f"file download for {file.display_name}")
+            CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+            if error_type != "circuit_open":
+                extraction_stats.increment("error_count")
+    else:
+        log.debug(f"      ✓ Already exists: {file.display_name}")
+
+
+def listCourseFiles(course):
+    """
+    Iterate the course files listing as its pages arrive, remembering when the
+    account may not read it. Only failures of the listing itself are recorded.
+    """
+    from canvasapi.exceptions import Forbidden, Unauthorized
+
+    try:
+        yield from guardedIter("course file listings", iterPaginated(course.get_files()))
+    except (Unauthorized, Forbidden):
+        authorization_cache.record_forbidden(course.id, AuthorizationCache.COURSE_FILES)
+        raise
+
+
 def downloadCourseFiles(course, course_view):
     # file full_name starts with "course files"
     dl_dir = os.path.join(DL_LOCATION, course_view.term,
                           course_view.course_code)
 
     # Create directory if not present
-    if not os.path.exists(dl_dir):
-        os.makedirs(dl_dir)
+    ensureDirectory(dl_dir)
+
+    if authorization_cache.is_forbidden(course.id, AuthorizationCache.COURSE_FILES):
+        log.warning("    Skipping: Not authorized to list course files (remembered from an earlier attempt)")
+        return
+
+    files_listed = 0
 
     try:
-        files = course.get_files()
-        files_list = list(files)  # Convert to list for consistency and count
+        # Downloads start while later pages of the listing are still being fetched
+        for file in listCourseFiles(course):
+            course_file_index[file.id] = file
+            files_listed += 1
 
-        for file in files_list:
-            file_folder=course.get_folder(file.folder_id)
+            if not export_filter.is_recent(getattr(file, "updated_at", None), getattr(file, "created_at", None)):
+                continue
+
+            file_folder=guardedCall("folder lookups", course.get_folder, file.folder_id)
             
             folder_dl_dir=os.path.join(dl_dir, makeValidFolderPath(file_folder.full_name))
             
-            if not os.path.exists(folder_dl_dir):
-                os.makedirs(folder_dl_dir)
+            ensureDirectory(folder_dl_dir)
         
             dl_path = os.path.join(folder_dl_dir, makeValidFilename(str(file.display_name)))
-            
-            print(f"    Downloading: {file.display_name}...")
-            if not os.path.exists(dl_path):
-                try:
-                    file.download(dl_path)
-                    extraction_stats.files_downloaded += 1
-                    print(f"      ✓ Saved: {file.display_name}")
-                except Exception as e:
-                    error_type, message = CanvasErrorHandler.handle_canvas_exception(e, f"file download for {file.display_name}")
-                    CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-                    extraction_stats.error_count += 1
-            else:
-                print(f"      ✓ Already exists: {file.display_name}")
+
+            download_pipeline.submit(_downloadCourseFile, file, dl_path)
 
     except Exception as e:
         error_type, message = CanvasErrorHandler.handle_canvas_exception(
             e, "course file download"
         )
         if error_type == "student_limitation":
-            extraction_stats.student_limitation_warnings += 1
-        else:
-            extraction_stats.error_count += 1
+            extraction_stats.increment("student_limitation_warnings")
+        elif error_type != "circuit_open":
+            extraction_stats.increment("error_count")
         CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
 
+    if files_listed:
+        log.info(f"    Found {files_listed} files")
+
+
+def queueAssignmentAttachments(course_view, assignment):
+    """Queue the attachments of every submission of one assignment for download."""
+    if not export_filter.wants("attachments"):
+        return
 
-def download_submission_attachments(course, course_view):
     course_dir = os.path.join(DL_LOCATION, course_view.term,
                               course_view.course_code)
 
-    # Create directory if not present
-    if not os.path.exists(course_dir):
-        os.makedirs(course_dir)
-
-    for assignment in course_view.assignments:
-        for submission in assignment.submissions:
-            assignment_title = makeValidFilename(str(assignment.title))
-            assignment_title = shortenFileName(assignment_title, len(assignment_title) - MAX_FOLDER_NAME_SIZE)
-            attachment_dir = os.path.join(course_dir, "assignments", assignment_title)
-            if(len(assignment.submissions)!=1):
-                attachment_dir = os.path.join(attachment_dir,str(submission.user_id))
-            if (not os.path.exists(attachment_dir)) and (submission.attachments):
-                os.makedirs(attachment_dir)
-            for attachment in submission.attachments:
-                filepath = os.path.join(attachment_dir, makeValidFilename(str(attachment.id) +
-                                        "_" + attachment.filename))
-                
-                print(f"    Downloading attachment: {attachment.filename}...")
-                if not os.path.exists(filepath):
-                    try:
-                        r = requests.get(attachment.url, allow_redirects=True)
-                        r.raise_for_status()
-                        with open(filepath, 'wb') as f:
-                            f.write(r.content)
-                        extraction_stats.attachments_downloaded += 1
-                        print(f"      ✓ Saved: {attachment.filename}")
-                    except Exception as e:
-                        print(f"      ❌ Failed to download {attachment.filename}: {e}")
-                        extraction_stats.error_count += 1
-                else:
-                    print(f"      ✓ Already exists: {attachment.filename}")
+    for submission in assignment.submissions:
+        assignment_title = makeValidFilename(str(assignment.title))
+        assignment_title = shortenFileName(assignment_title, len(assignment_title) - MAX_FOLDER_NAME_SIZE)
+        attachment_dir = os.path.join(course_dir, "assignments", assignment_title)
+        if(len(assignment.submissions)!=1):
+            attachment_dir = os.path.join(attachment_dir,str(submission.user_id))
+        for attachment in submission.attachments:
+            filepath = os.path.join(attachment_dir, makeValidFilename(str(attachment.id) +
+                                    "_" + attachment.filename))
+            download_pipeline.submit(_downloadAttachment, attachment, filepath)
+
+
+def _downloadAttachment(attachment, filepath):
+    """Download worker job for a submission attachment."""
+    log.debug(f"    Downloading attachment: {attachment.filename}...")
+    if needsDownload(filepath, attachment.size, attachment.updated_at):
+        try:
+            def write(tmp_path):
+                with http_session.get(attachment.url, allow_redirects=True, stream=True) as r:
+                    r.raise_for_status()
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in r.iter_content(chunk_size=1024 * 1024):
+                            f.write(chunk)
+
+            guardedCall("file downloads", saveDownload, filepath,
+                        downloadWriter(attachment.url, attachment.size, write), attachment.size, attachment.updated_at)
+            extraction_stats.increment("attachments_downloaded")
+            log.debug(f"      ✓ Saved: {attachment.filename}")
+        except CircuitOpen:
+            pass  # Reported once by the circuit breaker
+        except Exception as e:
+            log.warning(f"      ❌ Failed to download {attachment.filename}: {e}")
+            extraction_stats.increment("error_count")
+    else:
+        log.debug(f"      ✓ Already exists: {attachment.filename}")
 
 
 def getCoursePageUrls(course):
-    page_urls = []
-
+    """Yield the URL of each page of the course as the pages listing arrives."""
     try:
         # Get all pages
         pages = course.get_pages()
 
-        for page in pages:
-            if hasattr(page, "url"):
-                page_urls.append(str(page.url))
+        for page in iterPaginated(pages):
+            if hasattr(page, "url") and export_filter.is_recent(getattr(page, "updated_at", None)):
+                yield str(page.url)
     except Exception as e:
         error_msg = str(e)
         if "Not Found" not in error_msg:
@@ -537,229 +1349,355 @@ def getCoursePageUrls(course):
             )
             CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
             if error_type != "student_limitation":
-                extraction_stats.error_count += 1
+                extraction_stats.increment("error_count")
             else:
-                extraction_stats.student_limitation_warnings += 1
+                extraction_stats.increment("student_limitation_warnings")
 
-    return page_urls
 
+def getPageView(page):
+    page_view = pageView()
 
-def findCoursePages(course):
-    page_views = []
+    # ID (Canvas reports page ids as page_id)
+    page_view.id = page.id if hasattr(page, "id") else page.page_id if hasattr(page, "page_id") else 0
 
+    # URL (the page's slug)
+    page_view.url = str(page.url) if hasattr(page, "url") else ""
+    # Title
+    page_view.title = str(page.title) if hasattr(page, "title") else ""
+    # Body
+    page_view.body = str(page.body) if hasattr(page, "body") else ""
+    # Date created
     try:
-        # Get all page URLs
-        page_urls = getCoursePageUrls(course)
+        page_view.created_date = parseTimestamp(page.created_at).strftime(DATE_TEMPLATE) if \
+            hasattr(page, "created_at") else ""
+    except (ValueError, TypeError):
+        page_view.created_date = ""
 
-        for url in page_urls:
-            page = course.get_page(url)
+    # Date last updated
+    try:
+        page_view.last_updated_date = parseTimestamp(page.updated_at).strftime(DATE_TEMPLATE) if \
+            hasattr(page, "updated_at") else ""
+    except (ValueError, TypeError):
+        page_view.last_updated_date = ""
 
-            page_view = pageView()
+    return page_view
 
-            # ID
-            page_view.id = page.id if hasattr(page, "id") else 0
 
-            # Title
-            page_view.title = str(page.title) if hasattr(page, "title") else ""
-            # Body
-            page_view.body = str(page.body) if hasattr(page, "body") else ""
-            # Date created
-            try:
-                page_view.created_date = dateutil.parser.parse(page.created_at).strftime(DATE_TEMPLATE) if \
-                    hasattr(page, "created_at") else ""
-            except (ValueError, TypeError):
-                page_view.created_date = ""
-                
-            # Date last updated
+def findCoursePages(course):
+    page_views = []
+
+    try:
+        # Each page is fetched as soon as the listing yields its URL
+        for url in getCoursePageUrls(course):
             try:
-                page_view.last_updated_date = dateutil.parser.parse(page.updated_at).strftime(DATE_TEMPLATE) if \
-                    hasattr(page, "updated_at") else ""
-            except (ValueError, TypeError):
-                page_view.last_updated_date = ""
+                page = guardedCall("page fetches", course.get_page, url)
+            except Exception as e:
+                # One broken page should not cost the rest of the course's pages
+                error_type, message = CanvasErrorHandler.handle_canvas_exception(
+                    e, "page download"
+                )
+                CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+                if error_type != "circuit_open":
+                    extraction_stats.increment("error_count")
+                continue
+
+            page_view = getPageView(page)
 
             page_views.append(page_view)
-            extraction_stats.pages_found += 1
+            emitRecord("page", course, page_view)
+            extraction_stats.increment("pages_found")
+            log.stage("pages").advance()
     except Exception as e:
         error_type, message = CanvasErrorHandler.handle_canvas_exception(
             e, "page download"
         )
         CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-        extraction_stats.error_count += 1
+        extraction_stats.increment("error_count")
 
     return page_views
 
 
-def findCourseAssignments(course):
-    assignment_views = []
+def findCourseSubmissions(course, **filters):
+    """
+    Fetch the submissions of every assignment in a course through the paginated
+    multiple-submissions listing and group them by assignment id. Extra keyword
+    arguments (e.g. graded_since) are passed on to the listing as filters.
+    Returns None if the listing is unavailable, in which case callers fall back
+    to requesting submissions assignment by assignment.
+    """
+    from canvasapi.exceptions import Forbidden, Unauthorized
+
+    include = ["submission_comments"]
+    submissions_by_assignment = {}
 
-    # Get all assignments
-    assignments = course.get_assignments()
-    assignments_list = list(assignments)  # Convert to list for consistency
-    
     try:
-        for assignment in assignments_list:
-            # Create a new assignment view
-            assignment_view = assignmentView()
-
-            #ID
-            assignment_view.id = assignment.id if \
-                hasattr(assignment, "id") else 0
-
-            # Title
-            assignment_view.title = makeValidFilename(str(assignment.name)) if \
-                hasattr(assignment, "name") else ""
-            # Description
-            assignment_view.description = str(assignment.description) if \
-                hasattr(assignment, "description") else ""
-            
-            # Assigned date
-            try:
-                assignment_view.assigned_date = dateutil.parser.parse(assignment.created_at).strftime(DATE_TEMPLATE) if \
-                    hasattr(assignment, "created_at") and assignment.created_at else ""
-            except (ValueError, TypeError):
-                assignment_view.assigned_date = ""
-            
-            # Due date
-            try:
-                assignment_view.due_date = dateutil.parser.parse(assignment.due_at).strftime(DATE_TEMPLATE) if \
-                    hasattr(assignment, "due_at") and assignment.due_at else ""
-            except (ValueError, TypeError):
-                assignment_view.due_date = ""
-
-            # HTML Url
-            assignment_view.html_url = assignment.html_url if \
-                hasattr(assignment, "html_url") else ""   
-            # External URL
-            assignment_view.ext_url = str(assignment.url) if \
-                hasattr(assignment, "url") else ""
-            # Other URL (more up-to-date)
-            assignment_view.updated_url = str(assignment.submissions_download_url).split("submissions?")[0] if \
-                hasattr(assignment, "submissions_download_url") else ""
+        try: # Download all submissions for entire class
+            if authorization_cache.is_forbidden(course.id, AuthorizationCache.CLASS_SUBMISSIONS):
+                submissions = list(iterPaginated(course.get_multiple_submissions(student_ids=[USER_ID], include=include, **filters)))
+            else:
+                submissions = list(iterPaginated(course.get_multiple_submissions(student_ids=["all"], include=include, **filters)))
+        except (Unauthorized, Forbidden) as e:
+            authorization_cache.record_forbidden(course.id, AuthorizationCache.CLASS_SUBMISSIONS)
+            error_type, message = CanvasErrorHandler.handle_canvas_exception(
+                e, "class submission download"
+            )
+            if error_type == "student_limitation":
+                extraction_stats.increment("student_limitation_warnings")
+                if extraction_stats.student_limitation_warnings == 1:
+                    log.info(f"    Note: Not authorized to download every student's assignment submission. Downloading submission for user {USER_ID} only.")
+            else:
+                CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+                extraction_stats.increment("error_count")
 
-            try:
-                try: # Download all submissions for entire class
-                    submissions = assignment.get_submissions()
-                    submissions[0] # Trigger Unauthorized if not allowed
-                except (Unauthorized, Forbidden) as e:
-                    error_type, message = CanvasErrorHandler.handle_canvas_exception(
-                        e, "class submission download"
-                    )
-                    if error_type == "student_limitation":
-                        extraction_stats.student_limitation_warnings += 1
-                        if extraction_stats.student_limitation_warnings == 1:
-                            print(f"    Note: Not authorized to download every student's assignment submission. Downloading submission for user {USER_ID} only.")
-                    else:
-                        CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-                        extraction_stats.error_count += 1
-                    
-                    # Download submission for this user only
+            # Download submissions for this user only
+            submissions = list(iterPaginated(course.get_multiple_submissions(student_ids=[USER_ID], include=include, **filters)))
+    except Exception as e:
+        error_type, message = CanvasErrorHandler.handle_canvas_exception(
+            e, "bulk submission retrieval"
+        )
+        if args.verbose:
+            CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+            log.warning("    Falling back to per-assignment submission requests")
+        return None
+
+    for submission in submissions:
+        assignment_id = submission.assignment_id if hasattr(submission, "assignment_id") else None
+        submissions_by_assignment.setdefault(assignment_id, []).append(submission)
+
+    return submissions_by_assignment
+
+
+def getAssignmentView(course, assignment, course_submissions=None):
+    """
+    Build the view of one assignment and its submissions. course_submissions is
+    the result of findCourseSubmissions(); when it is None the submissions are
+    requested for this assignment alone.
+    """
+    from canvasapi.exceptions import Forbidden, ResourceDoesNotExist, Unauthorized
+
+    # Create a new assignment view
+    assignment_view = assignmentView()
+
+    #ID
+    assignment_view.id = assignment.id if \
+        hasattr(assignment, "id") else 0
+
+    # Title
+    assignment_view.title = makeValidFilename(str(assignment.name)) if \
+        hasattr(assignment, "name") else ""
+    # Description
+    assignment_view.description = str(assignment.description) if \
+        hasattr(assignment, "description") else ""
+
+    # Assigned date
+    try:
+        assignment_view.assigned_date = parseTimestamp(assignment.created_at).strftime(DATE_TEMPLATE) if \
+            hasattr(assignment, "created_at") and assignment.created_at else ""
+    except (ValueError, TypeError):
+        assignment_view.assigned_date = ""
+
+    # Due date
+    try:
+        assignment_view.due_date = parseTimestamp(assignment.due_at).strftime(DATE_TEMPLATE) if \
+            hasattr(assignment, "due_at") and assignment.due_at else ""
+    except (ValueError, TypeError):
+        assignment_view.due_date = ""
+
+    # HTML Url
+    assignment_view.html_url = assignment.html_url if \
+        hasattr(assignment, "html_url") else ""   
+    # External URL
+    assignment_view.ext_url = str(assignment.url) if \
+        hasattr(assignment, "url") else ""
+    # Other URL (more up-to-date)
+    assignment_view.updated_url = str(assignment.submissions_download_url).split("submissions?")[0] if \
+        hasattr(assignment, "submissions_download_url") else ""
+
+    try:
+        if course_submissions is not None:
+            # Assignments without a submission record simply have none to export
+            submissions = course_submissions.get(assignment_view.id, [])
+        else:
+            try: # Download all submissions for entire class
+                if authorization_cache.is_forbidden(course.id, AuthorizationCache.CLASS_SUBMISSIONS):
                     submissions = [assignment.get_submission(USER_ID)]
-                submissions[0] #throw error if no submissions found at all but without error
-            except (ResourceDoesNotExist, NameError, IndexError) as e:
-                error_type, message = CanvasErrorHandler.handle_canvas_exception(
-                    e, "submission retrieval"
-                )
-                CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-                extraction_stats.error_count += 1
-            except Exception as e:
+                else:
+                    submissions = assignment.get_submissions()
+                submissions[0] # Trigger Unauthorized if not allowed
+            except (Unauthorized, Forbidden) as e:
+                authorization_cache.record_forbidden(course.id, AuthorizationCache.CLASS_SUBMISSIONS)
                 error_type, message = CanvasErrorHandler.handle_canvas_exception(
-                    e, "submission retrieval"
+                    e, "class submission download"
                 )
-                CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-                extraction_stats.error_count += 1
-            else:
+                if error_type == "student_limitation":
+                    extraction_stats.increment("student_limitation_warnings")
+                    if extraction_stats.student_limitation_warnings == 1:
+                        log.info(f"    Note: Not authorized to download every student's assignment submission. Downloading submission for user {USER_ID} only.")
+                else:
+                    CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+                    extraction_stats.increment("error_count")
+
+                # Download submission for this user only
+                submissions = [assignment.get_submission(USER_ID)]
+            submissions[0] #throw error if no submissions found at all but without error
+    except (ResourceDoesNotExist, NameError, IndexError) as e:
+        error_type, message = CanvasErrorHandler.handle_canvas_exception(
+            e, "submission retrieval"
+        )
+        CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+        extraction_stats.increment("error_count")
+    except Exception as e:
+        error_type, message = CanvasErrorHandler.handle_canvas_exception(
+            e, "submission retrieval"
+        )
+        CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+        extraction_stats.increment("error_count")
+    else:
+        try:
+            for submission in submissions:
+
+                sub_view = submissionView()
+
+                # Submission ID
+                sub_view.id = submission.id if \
+                    hasattr(submission, "id") else 0
+
+                # My grade
+                sub_view.grade = str(submission.grade) if \
+                    hasattr(submission, "grade") else ""
+                # My raw score
+                sub_view.raw_score = str(submission.score) if \
+                    hasattr(submission, "score") else ""
+                # Total possible score
+                sub_view.total_possible_points = str(assignment.points_possible) if \
+                    hasattr(assignment, "points_possible") else ""
+                # Submission comments
+                sub_view.submission_comments = str(submission.submission_comments) if \
+                    hasattr(submission, "submission_comments") else ""
+                # Attempt
+                sub_view.attempt = submission.attempt if \
+                    hasattr(submission, "attempt") and submission.attempt is not None else 0
+                # User ID
+                sub_view.user_id = str(submission.user_id) if \
+                    hasattr(submission, "user_id") else ""
+
+                # Submission URL
+                sub_view.preview_url = str(submission.preview_url) if \
+                    hasattr(submission, "preview_url") else ""
+                #   External URL
+                sub_view.ext_url = str(submission.url) if \
+                    hasattr(submission, "url") else ""
+
                 try:
-                    for submission in submissions:
-
-                        sub_view = submissionView()
-
-                        # Submission ID
-                        sub_view.id = submission.id if \
-                            hasattr(submission, "id") else 0
-                            
-                        # My grade
-                        sub_view.grade = str(submission.grade) if \
-                            hasattr(submission, "grade") else ""
-                        # My raw score
-                        sub_view.raw_score = str(submission.score) if \
-                            hasattr(submission, "score") else ""
-                        # Total possible score
-                        sub_view.total_possible_points = str(assignment.points_possible) if \
-                            hasattr(assignment, "points_possible") else ""
-                        # Submission comments
-                        sub_view.submission_comments = str(submission.submission_comments) if \
-                            hasattr(submission, "submission_comments") else ""
-                        # Attempt
-                        sub_view.attempt = submission.attempt if \
-                            hasattr(submission, "attempt") and submission.attempt is not None else 0
-                        # User ID
-                        sub_view.user_id = str(submission.user_id) if \
-                            hasattr(submission, "user_id") else ""
-                            
-                        # Submission URL
-                        sub_view.preview_url = str(submission.preview_url) if \
-                            hasattr(submission, "preview_url") else ""
-                        #   External URL
-                        sub_view.ext_url = str(submission.url) if \
-                            hasattr(submission, "url") else ""
+                    submission.attachments
+                except AttributeError:
+                    pass  # No attachments message removed for cleaner output
+                else:
+                    attachment_count = len(submission.attachments) if submission.attachments else 0
+                    if attachment_count > 0:
+                        log.debug(f"        Found {attachment_count} attachments")
+                    for attachment in submission.attachments:
+                        attach_view = attachmentView()
+                        attach_view.url = attachment.url
+                        attach_view.id = attachment.id
+                        attach_view.filename = attachment.filename
+                        attach_view.size = attachment.size if hasattr(attachment, "size") else None
+                        attach_view.updated_at = str(attachment.updated_at) if hasattr(attachment, "updated_at") else ""
+                        sub_view.attachments.append(attach_view)
+                    assignment_view.submissions.append(sub_view)
+                    emitRecord("submission", course, sub_view, assignment_id=assignment_view.id)
+                    extraction_stats.increment("submissions_found")
+        except Exception as e:
+            error_type, message = CanvasErrorHandler.handle_canvas_exception(
+                e, "submission processing"
+            )
+            CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+            extraction_stats.increment("error_count")
 
-                        try:
-                            submission.attachments
-                        except AttributeError:
-                            pass  # No attachments message removed for cleaner output
-                        else:
-                            attachment_count = len(submission.attachments) if submission.attachments else 0
-                            if attachment_count > 0:
-                                print(f"        Found {attachment_count} attachments")
-                            for attachment in submission.attachments:
-                                attach_view = attachmentView()
-                                attach_view.url = attachment.url
-                                attach_view.id = attachment.id
-                                attach_view.filename = attachment.filename
-                                sub_view.attachments.append(attach_view)
-                            assignment_view.submissions.append(sub_view)
-                            extraction_stats.submissions_found += 1
-                except Exception as e:
-                    error_type, message = CanvasErrorHandler.handle_canvas_exception(
-                        e, "submission processing"
-                    )
-                    CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-                    extraction_stats.error_count += 1
+    return assignment_view
+
+
+def isRecentAssignment(assignment, course_submissions=None):
+    """
+    Whether an assignment passes the updated-since filter: it was edited, or
+    (when the course submissions are known) one of its submissions was turned
+    in or graded since the cut-off.
+    """
+    timestamps = [getattr(assignment, "updated_at", None)]
+    for submission in (course_submissions or {}).get(assignment.id, []):
+        timestamps += [getattr(submission, "submitted_at", None), getattr(submission, "graded_at", None)]
+    return export_filter.is_recent(*timestamps)
+
+
+def findCourseAssignments(course, course_view=None):
+    assignment_views = []
+
+    # Assignments are processed as their pages arrive; only the first page is
+    # waited for, so a course without assignments needs no submissions request
+    assignments = iterPaginated(course.get_assignments())
+    first_assignment = next(assignments, None)
+    if first_assignment is None:
+        return assignment_views
+
+    # Get every submission in the course up front and join them to assignments by id
+    course_submissions = findCourseSubmissions(course)
+
+    try:
+        for assignment in itertools.chain([first_assignment], assignments):
+            if export_filter.updated_since is not None and not isRecentAssignment(assignment, course_submissions):
+                continue
+
+            assignment_view = getAssignmentView(course, assignment, course_submissions)
 
             assignment_views.append(assignment_view)
-            extraction_stats.assignments_found += 1
+            if course_view is not None:
+                # Start transferring this assignment's attachments while the rest of the course is fetched
+                queueAssignmentAttachments(course_view, assignment_view)
+            emitRecord("assignment", course, assignment_view, exclude=("submissions",))
+            extraction_stats.increment("assignments_found")
+            log.stage("assignments").advance()
     except Exception as e:
         error_type, message = CanvasErrorHandler.handle_canvas_exception(
             e, "course assignments processing"
         )
         CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-        extraction_stats.error_count += 1
+        extraction_stats.increment("error_count")
 
     return assignment_views
 
 
+def isRecentTopic(topic):
+    """Whether a discussion topic or announcement passes the updated-since filter."""
+    return export_filter.is_recent(getattr(topic, "updated_at", None), getattr(topic, "last_reply_at", None),
+                                   getattr(topic, "posted_at", None))
+
+
 def findCourseAnnouncements(course):
     announcement_views = []
 
     try:
         announcements = course.get_discussion_topics(only_announcements=True)
 
-        for announcement in announcements:
-            discussion_view = getDiscussionView(announcement)
+        for announcement in iterPaginated(announcements):
+            if not isRecentTopic(announcement):
+                continue
+            discussion_view = getDiscussionView(announcement, course)
+            emitRecord("announcement", course, discussion_view, exclude=("topic_entries",))
 
             announcement_views.append(discussion_view)
-            extraction_stats.announcements_found += 1
+            extraction_stats.increment("announcements_found")
+            log.stage("discussions").advance()
     except Exception as e:
         error_type, message = CanvasErrorHandler.handle_canvas_exception(
             e, "announcement processing"
         )
         CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-        extraction_stats.error_count += 1
+        extraction_stats.increment("error_count")
 
     return announcement_views
 
 
-def getDiscussionView(discussion_topic):
+def getDiscussionView(discussion_topic, course=None):
     # Create discussion view
     discussion_view = discussionView()
 
@@ -772,7 +1710,7 @@ def getDiscussionView(discussion_topic):
     discussion_view.author = str(discussion_topic.user_name) if hasattr(discussion_topic, "user_name") else ""
     # Posted date
     try:
-        discussion_view.posted_date = dateutil.parser.parse(discussion_topic.created_at).strftime("%B %d, %Y %I:%M %p") if \
+        discussion_view.posted_date = parseTimestamp(discussion_topic.created_at).strftime("%B %d, %Y %I:%M %p") if \
             hasattr(discussion_topic, "created_at") and discussion_topic.created_at else ""
     except (ValueError, TypeError):
         discussion_view.posted_date = ""
@@ -792,7 +1730,7 @@ def getDiscussionView(discussion_topic):
         discussion_topic_entries = discussion_topic.get_topic_entries()
 
         try:
-            for topic_entry in discussion_topic_entries:
+            for topic_entry in iterPaginated(discussion_topic_entries):
                 topic_entries_counter += 1
                 
                 # Create new discussion view for the topic_entry
@@ -804,7 +1742,7 @@ def getDiscussionView(discussion_topic):
                 topic_entry_view.author = str(topic_entry.user_name) if hasattr(topic_entry, "user_name") else ""
                 # Posted date
                 try:
-                    topic_entry_view.posted_date = dateutil.parser.parse(topic_entry.created_at).strftime("%B %d, %Y %I:%M %p") if \
+                    topic_entry_view.posted_date = parseTimestamp(topic_entry.created_at).strftime("%B %d, %Y %I:%M %p") if \
                         hasattr(topic_entry, "created_at") and topic_entry.created_at else ""
                 except (ValueError, TypeError):
                     topic_entry_view.posted_date = ""
@@ -815,7 +1753,7 @@ def getDiscussionView(discussion_topic):
                 topic_entry_replies = topic_entry.get_replies()
 
                 try:
-                    for topic_reply in topic_entry_replies:
+                    for topic_reply in guardedCall("discussion reply listings", list, iterPaginated(topic_entry_replies)):
                         # Create new topic reply view
                         topic_reply_view = topicReplyView()
                         
@@ -826,7 +1764,7 @@ def getDiscussionView(discussion_topic):
                         topic_reply_view.author = str(topic_reply.user_name) if hasattr(topic_reply, "user_name") else ""
                         # Posted Date
                         try:
-                            topic_reply_view.posted_date = dateutil.parser.parse(topic_reply.created_at).strftime("%B %d, %Y %I:%M %p") if \
+                            topic_reply_view.posted_date = parseTimestamp(topic_reply.created_at).strftime("%B %d, %Y %I:%M %p") if \
                                 hasattr(topic_reply, "created_at") and topic_reply.created_at else ""
                         except (ValueError, TypeError):
                             topic_reply_view.posted_date = ""
@@ -839,15 +1777,18 @@ def getDiscussionView(discussion_topic):
                         e, "discussion topic reply processing"
                     )
                     CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-                    extraction_stats.error_count += 1
+                    if error_type != "circuit_open":
+                        extraction_stats.increment("error_count")
 
                 discussion_view.topic_entries.append(topic_entry_view)
+                if course is not None:
+                    emitRecord("discussion_entry", course, topic_entry_view, discussion_id=discussion_view.id)
         except Exception as e:
             error_type, message = CanvasErrorHandler.handle_canvas_exception(
                 e, "discussion topic entry processing"
             )
             CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-            extraction_stats.error_count += 1
+            extraction_stats.increment("error_count")
         
     # Amount of pages  
     discussion_view.amount_pages = int(topic_entries_counter/50) + 1 # Typically 50 topic entries are stored on a page before it creates another page.
@@ -861,22 +1802,218 @@ def findCourseDiscussions(course):
     try:
         discussion_topics = course.get_discussion_topics()
 
-        for discussion_topic in discussion_topics:
+        for discussion_topic in iterPaginated(discussion_topics):
+            if not isRecentTopic(discussion_topic):
+                continue
             discussion_view = None
-            discussion_view = getDiscussionView(discussion_topic)
+            discussion_view = getDiscussionView(discussion_topic, course)
+            emitRecord("discussion", course, discussion_view, exclude=("topic_entries",))
 
             discussion_views.append(discussion_view)
-            extraction_stats.discussions_found += 1
+            extraction_stats.increment("discussions_found")
+            log.stage("discussions").advance()
     except Exception as e:
         error_type, message = CanvasErrorHandler.handle_canvas_exception(
             e, "discussion processing"
         )
         CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
-        extraction_stats.error_count += 1
+        extraction_stats.increment("error_count")
 
     return discussion_views
 
 
+def _graphqlDate(timestamp):
+    try:
+        return parseTimestamp(timestamp).strftime(DATE_TEMPLATE) if timestamp else ""
+    except (ValueError, TypeError):
+        return ""
+
+
+def fetchWithFallback(description, graphql_fetch, rest_fetch):
+    """
+    Fetch through the GraphQL backend when it is enabled, and through REST if it
+    is not, its query fails or its response cannot be mapped to views.
+    """
+    import requests
+    from canvasapi.exceptions import CanvasException
+
+    if graphql_client is not None:
+        try:
+            return graphql_fetch()
+        except (GraphQLError, CanvasException, requests.exceptions.RequestException) as e:
+            log.info(f"    Note: GraphQL {description} query failed, using the REST API instead ({e})")
+        except (KeyError, ValueError, TypeError) as e:
+            # A node the mappers cannot read means the response is not what they expect
+            log.info(f"    Note: GraphQL {description} response could not be read, using the REST API instead ({e!r})")
+    return rest_fetch()
+
+
+def findCourseAssignmentsGraphQL(course, course_view=None):
+    """
+    GraphQL counterpart of findCourseAssignments(). URLs that GraphQL does not
+    expose (the submission preview and the assignment's submissions page) are
+    built the way the REST API reports them.
+    """
+    assignment_views = []
+
+    for assignment in graphql_client.course_assignments(course.id):
+        submissions = assignment.get("submissionsConnection") or []
+        if not export_filter.is_recent(assignment.get("updatedAt"),
+                                       *[submission.get("submittedAt") for submission in submissions],
+                                       *[submission.get("gradedAt") for submission in submissions]):
+            continue
+
+        assignment_view = assignmentView()
+        assignment_view.id = int(assignment["_id"])
+        assignment_view.title = makeValidFilename(str(assignment.get("name")))
+        assignment_view.description = str(assignment.get("description"))
+        assignment_view.assigned_date = _graphqlDate(assignment.get("createdAt"))
+        assignment_view.due_date = _graphqlDate(assignment.get("dueAt"))
+        assignment_view.html_url = assignment.get("htmlUrl") or ""
+        assignment_view.updated_url = f"{API_URL}/courses/{course.id}/assignments/{assignment_view.id}/"
+
+        for submission in submissions:
+            sub_view = submissionView()
+            sub_view.id = int(submission["_id"])
+            sub_view.grade = str(submission.get("grade"))
+            sub_view.raw_score = str(submission.get("score"))
+            sub_view.total_possible_points = str(assignment.get("pointsPossible"))
+            sub_view.submission_comments = str([
+                {
+                    "id": int(comment["_id"]),
+                    "author_id": int((comment.get("author") or {}).get("_id") or 0),
+                    "author_name": (comment.get("author") or {}).get("name") or "",
+                    "comment": comment.get("comment") or "",
+                    "created_at": comment.get("createdAt"),
+                }
+                for comment in (submission.get("commentsConnection") or {}).get("nodes") or []
+            ])
+            sub_view.attempt = submission.get("attempt") or 0
+            sub_view.user_id = str((submission.get("user") or {}).get("_id", ""))
+            sub_view.preview_url = (f"{API_URL}/courses/{course.id}/assignments/{assignment_view.id}"
+                                    f"/submissions/{sub_view.user_id}?preview=1&version={sub_view.attempt}")
+            sub_view.ext_url = str(submission.get("url"))
+
+            for attachment in submission.get("attachments") or []:
+                attach_view = attachmentView()
+                attach_view.id = int(attachment["_id"])
+                attach_view.filename = attachment.get("displayName") or ""
+                attach_view.url = attachment.get("url") or ""
+                # GraphQL reports File.size as a string, which is not always a plain byte count
+                size = str(attachment.get("size") or "")
+                attach_view.size = int(size) if size.isdigit() else None
+                attach_view.updated_at = str(attachment.get("updatedAt") or "")
+                sub_view.attachments.append(attach_view)
+
+            assignment_view.submissions.append(sub_view)
+            emitRecord("submission", course, sub_view, assignment_id=assignment_view.id)
+            extraction_stats.increment("submissions_found")
+
+        assignment_views.append(assignment_view)
+        if course_view is not None:
+            queueAssignmentAttachments(course_view, assignment_view)
+        emitRecord("assignment", course, assignment_view, exclude=("submissions",))
+        extraction_stats.increment("assignments_found")
+        log.stage("assignments").advance()
+
+    return assignment_views
+
+
+def findCourseDiscussionsGraphQL(course):
+    """
+    GraphQL counterpart of findCourseAnnouncements() and findCourseDiscussions(),
+    which share one query. Returns (announcement views, discussion views).
+    """
+    views = {"announcements": [], "discussions": []}
+
+    for topic in graphql_client.course_discussions(course.id):
+        kind = "announcements" if topic.get("isAnnouncement") else "discussions"
+        if not export_filter.wants(kind):
+            continue
+        if not export_filter.is_recent(topic.get("updatedAt"), topic.get("lastReplyAt"), topic.get("postedAt")):
+            continue
+
+        discussion_view = discussionView()
+        discussion_view.id = int(topic["_id"])
+        discussion_view.title = str(topic.get("title") or "")
+        discussion_view.author = str((topic.get("author") or {}).get("name") or "")
+        discussion_view.posted_date = _graphqlDate(topic.get("createdAt"))
+        discussion_view.body = str(topic.get("message"))
+        discussion_view.url = f"{API_URL}/courses/{course.id}/discussion_topics/{discussion_view.id}"
+
+        entries = topic.get("discussionEntriesConnection") or []
+        for entry in entries:
+            topic_entry_view = topicEntryView()
+            topic_entry_view.id = int(entry["_id"])
+            topic_entry_view.author = str((entry.get("author") or {}).get("name") or "")
+            topic_entry_view.posted_date = _graphqlDate(entry.get("createdAt"))
+            topic_entry_view.body = str(entry.get("message"))
+
+            for reply in entry.get("discussionSubentriesConnection") or []:
+                topic_reply_view = topicReplyView()
+                topic_reply_view.id = int(reply["_id"])
+                topic_reply_view.author = str((reply.get("author") or {}).get("name") or "")
+                topic_reply_view.posted_date = _graphqlDate(reply.get("createdAt"))
+                topic_reply_view.body = str(reply.get("message"))
+                topic_entry_view.topic_replies.append(topic_reply_view)
+
+            discussion_view.topic_entries.append(topic_entry_view)
+            emitRecord("discussion_entry", course, topic_entry_view, discussion_id=discussion_view.id)
+
+        # Typically 50 topic entries are stored on a page before it creates another page.
+        discussion_view.amount_pages = int(len(entries) / 50) + 1
+
+        views[kind].append(discussion_view)
+        emitRecord(kind[:-1], course, discussion_view, exclude=("topic_entries",))
+        extraction_stats.increment(f"{kind}_found")
+        log.stage("discussions").advance()
+
+    return views["announcements"], views["discussions"]
+
+
+def findCourseModulesGraphQL(course, course_view):
+    """GraphQL counterpart of findCourseModules(); module files are still resolved and downloaded over REST."""
+    modules_dir = os.path.join(DL_LOCATION, course_view.term,
+                               course_view.course_code, "modules")
+    ensureDirectory(modules_dir)
+
+    module_views = []
+
+    modules = graphql_client.course_modules(course.id)
+    if not modules:
+        log.info("    No modules found in this course")
+    else:
+        log.info(f"    Found {len(modules)} modules")
+
+    for module in modules:
+        module_view = moduleView()
+        module_view.id = int(module["_id"])
+        module_view.name = str(module.get("name") or "")
+
+        for item in module.get("moduleItems") or []:
+            content = item.get("content") or {}
+
+            module_item_view = moduleItemView()
+            module_item_view.id = int(item["_id"])
+            module_item_view.title = str(content.get("title") or "")
+            module_item_view.content_type = MODULE_ITEM_TYPES.get(content.get("__typename"), str(content.get("__typename") or ""))
+            module_item_view.url = item.get("url") or ""
+            module_item_view.external_url = content.get("externalUrl") or ""
+
+            if module_item_view.content_type == "File" and content.get("_id") and export_filter.wants("files"):
+                queueModuleFile(course, modules_dir, module_view.name, int(content["_id"]))
+
+            module_view.items.append(module_item_view)
+            emitRecord("module_item", course, module_item_view, module_id=module_view.id)
+            extraction_stats.increment("module_items_found")
+
+        module_views.append(module_view)
+        extraction_stats.increment("modules_found")
+        log.stage("modules").advance()
+
+    return module_views
+
+
 def getCourseView(course):
     course_view = courseView()
 
@@ -884,7 +2021,7 @@ def getCourseView(course):
     course_view.course_id = course.id if hasattr(course, "id") else 0
 
     # Course term
-    course_view.term = makeValidFilename(course.term.name if hasattr(course, "term") and hasattr(course.term, "name") else "")
+    course_view.term = makeValidFilename(courseTermName(course))
 
     # Course code
     course_view.course_code = makeValidFilename(course.course_code if hasattr(course, "course_code") else "")
@@ -892,53 +2029,70 @@ def getCourseView(course):
     # Course name
     course_view.name = course.name if hasattr(course, "name") else ""
 
-    print(f"Working on: {course_view.term}: {course_view.name}")
+    # Snapshot what is already on disk for this course before any download is queued
+    global output_index, course_file_index, module_page_index
+    output_index = OutputIndex(os.path.join(DL_LOCATION, course_view.term, course_view.course_code))
+    course_file_index = {}
+    module_page_index = {}
+
+    log.info(f"Working on: {course_view.term}: {course_view.name}")
 
     # Track HTML pages saved per course
     html_pages_saved_in_course = 0
 
     # Course assignments
-    print("  Getting assignments")
-    course_view.assignments = findCourseAssignments(course)
-    print(f"    Found {len(course_view.assignments)} assignments")
+    if export_filter.wants("assignments"):
+        log.info("  Getting assignments")
+        course_view.assignments = fetchWithFallback("assignment",
+                                                    lambda: findCourseAssignmentsGraphQL(course, course_view),
+                                                    lambda: findCourseAssignments(course, course_view))
+        log.info(f"    Found {len(course_view.assignments)} assignments")
+
+    # With the GraphQL backend, announcements and discussions arrive in one query
+    graphql_topics = None
+    if export_filter.wants("announcements") or export_filter.wants("discussions"):
+        graphql_topics = fetchWithFallback("discussion", lambda: findCourseDiscussionsGraphQL(course), lambda: None)
 
     # Course announcements
-    print("  Getting announcements")
-    course_view.announcements = findCourseAnnouncements(course)
-    print(f"    Found {len(course_view.announcements)} announcements")
+    if export_filter.wants("announcements"):
+        log.info("  Getting announcements")
+        course_view.announcements = graphql_topics[0] if graphql_topics is not None else findCourseAnnouncements(course)
+        log.info(f"    Found {len(course_view.announcements)} announcements")
 
     # Course discussions
-    print("  Getting discussions")
-    course_view.discussions = findCourseDiscussions(course)
-    print(f"    Found {len(course_view.discussions)} discussions")
+    if export_filter.wants("discussions"):
+        log.info("  Getting discussions")
+        course_view.discussions = graphql_topics[1] if graphql_topics is not None else findCourseDiscussions(course)
+        log.info(f"    Found {len(course_view.discussions)} discussions")
 
     # Course pages
-    print("  Getting pages")
-    course_view.pages = findCoursePages(course)
-    print(f"    Found {len(course_view.pages)} pages")
+    if export_filter.wants("pages"):
+        log.info("  Getting pages")
+        course_view.pages = findCoursePages(course)
+        log.info(f"    Found {len(course_view.pages)} pages")
 
     return course_view
 
 
 def exportAllCourseData(course_view):
+    import jsonpickle
+
     json_str = json.dumps(json.loads(jsonpickle.encode(course_view, unpicklable = False)), indent = 4)
 
     course_output_dir = os.path.join(DL_LOCATION, course_view.term,
                                      course_view.course_code)
 
     # Create directory if not present
-    if not os.path.exists(course_output_dir):
-        os.makedirs(course_output_dir)
+    ensureDirectory(course_output_dir)
 
     course_output_path = os.path.join(course_output_dir,
                                       course_view.course_code + ".json")
 
-    print(f"    Exporting JSON data for {course_view.course_code}...")
-    with open(course_output_path, "w") as out_file:
-        out_file.write(json_str)
+    log.debug(f"    Exporting JSON data for {course_view.course_code}...")
+    course_output_path = writeJSONOutput(course_output_path, json_str)
         
-    extraction_stats.json_files_created += 1
-    print(f"      ✓ Data saved to: {course_output_path}")
+    extraction_stats.increment("json_files_created")
+    log.debug(f"      ✓ Data saved to: {course_output_path}")
 
 def _download_page_if_not_exists(url, output_path, cookies_path, additional_args=(), verbose=False):
     """
@@ -950,26 +2104,30 @@ def _download_page_if_not_exists(url, output_path, cookies_path, additional_args
         return False
         
     filename = os.path.basename(output_path)
-    print(f"    Downloading: {filename}...")
+    log.debug(f"    Downloading: {filename}...")
 
-    if not os.path.exists(output_path):
+    if existingOutput(output_path) is None:
         output_dir = os.path.dirname(output_path)
-        os.makedirs(output_dir, exist_ok=True)
+        ensureDirectory(output_dir)
         
         try:
+            if verbose:
+                log.flush()  # SingleFile prints its command line directly
             download_page(url, cookies_path, output_dir, filename, additional_args, verbose)
-            extraction_stats.html_pages_downloaded += 1
-            print(f"      ✓ Saved: {filename}")
+            recordFile(compressed_name(output_path, snapshotCompression()))
+            extraction_stats.increment("html_pages_downloaded")
+            log.stage("html").advance()
+            log.debug(f"      ✓ Saved: {filename}")
             return True
         except Exception as e:
-            print(f"      ❌ Failed: {e}")
-            extraction_stats.error_count += 1
+            log.warning(f"      ❌ Failed: {e}")
+            extraction_stats.increment("error_count")
             if "Authentication failed" in str(e):
-                print("      Stopping all subsequent HTML downloads.")
+                log.warning("      Stopping all subsequent HTML downloads.")
                 stop_html_downloads = True
             return False
     else:
-        print(f"      ✓ Already exists: {filename}")
+        log.debug(f"      ✓ Already exists: {filename}")
         return True # Return True because the file exists, which is a success condition for the caller
 
 def downloadCourseHTML(api_url, cookies_path, verbose=False):
@@ -1007,43 +2165,43 @@ def downloadCourseGradesHTML(api_url, course_view, cookies_path, verbose=False):
 
     if _download_page_if_not_exists(url, grades_path, cookies_path, additional_args, verbose=verbose):
         # We only proceed with BeautifulSoup modifications if the file was newly downloaded or already existed.
-        with open(grades_path, "r+t", encoding="utf-8") as grades_file:
-            grades_html = BeautifulSoup(grades_file, "html.parser")
-
-            button = grades_html.select_one("#show_all_details_button")
-            if button is not None:
-                button_class = button.get_attribute_list("class", [])
-                if "showAll" not in button_class:
-                    button_class.append("showAll")
-                button["class"] = button_class
-                button.string = "Hide All Details" # Unfortunately this cannot handle i18n.
-
-            assignments = grades_html.select("tr.student_assignment.editable")
-            for assignment in assignments:
-                assignment_id = str(assignment.get("id", "")).removeprefix("submission_")
-                muted = str(assignment.get("data-muted", "")).casefold() in {"true"}
-                if not muted:
-                    for element in itertools.chain(
-                        grades_html.select(f"#comments_thread_{assignment_id}"),
-                        grades_html.select(f"#rubric_{assignment_id}"),
-                        grades_html.select(f"#grade_info_{assignment_id}"),
-                        grades_html.select(f"#final_grade_info_{assignment_id}"),
-                        grades_html.select(f".parent_assignment_id_{assignment_id}"),
-                    ):
-                        element_style = str(element.get("style", ""))
-                        element_style = re.sub(r"display:\s*none", "", element_style)
-                        element["style"] = element_style
-
-                    assignment_arrow = grades_html.select_one(f"#parent_assignment_id_{assignment_id} i")
-                    if assignment_arrow is not None:
-                        assignment_arrow_class = assignment_arrow.get_attribute_list("class", [])
-                        assignment_arrow_class.remove("icon-arrow-open-end")
-                        assignment_arrow_class.append("icon-arrow-open-down")
-                        assignment_arrow["class"] = assignment_arrow_class
-
-            grades_file.seek(0)
-            grades_file.write(grades_html.prettify(formatter="html"))
-            grades_file.truncate()
+        from bs4 import BeautifulSoup
+
+        grades_path = existingOutput(grades_path) or grades_path
+        grades_html = BeautifulSoup(read_text(grades_path), "html.parser")
+
+        button = grades_html.select_one("#show_all_details_button")
+        if button is not None:
+            button_class = button.get_attribute_list("class", [])
+            if "showAll" not in button_class:
+                button_class.append("showAll")
+            button["class"] = button_class
+            button.string = "Hide All Details" # Unfortunately this cannot handle i18n.
+
+        assignments = grades_html.select("tr.student_assignment.editable")
+        for assignment in assignments:
+            assignment_id = str(assignment.get("id", "")).removeprefix("submission_")
+            muted = str(assignment.get("data-muted", "")).casefold() in {"true"}
+            if not muted:
+                for element in itertools.chain(
+                    grades_html.select(f"#comments_thread_{assignment_id}"),
+                    grades_html.select(f"#rubric_{assignment_id}"),
+                    grades_html.select(f"#grade_info_{assignment_id}"),
+                    grades_html.select(f"#final_grade_info_{assignment_id}"),
+                    grades_html.select(f".parent_assignment_id_{assignment_id}"),
+                ):
+                    element_style = str(element.get("style", ""))
+                    element_style = re.sub(r"display:\s*none", "", element_style)
+                    element["style"] = element_style
+
+                assignment_arrow = grades_html.select_one(f"#parent_assignment_id_{assignment_id} i")
+                if assignment_arrow is not None:
+                    assignment_arrow_class = assignment_arrow.get_attribute_list("class", [])
+                    assignment_arrow_class.remove("icon-arrow-open-end")
+                    assignment_arrow_class.append("icon-arrow-open-down")
+                    assignment_arrow["class"] = assignment_arrow_class
+
+        write_text(grades_path, grades_html.prettify(formatter="html"))
         return 1
     return 0
         
@@ -1094,9 +2252,62 @@ def downloadAssignmentPages(api_url, course_view, cookies_path, verbose=False):
                         pages_saved += 1
     return pages_saved
 
+def _render_offline_if_not_exists(output_path, title, posts):
+    """
+    Render a page from API content with the offline renderer unless it already
+    exists, updating stats. Returns True if the page exists afterwards.
+    """
+    filename = os.path.basename(output_path)
+    log.debug(f"    Rendering: {filename}...")
+
+    if existingOutput(output_path) is not None:
+        log.debug(f"      ✓ Already exists: {filename}")
+        return True
+
+    ensureDirectory(os.path.dirname(output_path))
+    output_path = compressed_name(output_path, snapshotCompression())
+    try:
+        write_text(output_path, offline_renderer.render(title, posts))
+    except Exception as e:
+        log.warning(f"      ❌ Failed: {e}")
+        extraction_stats.increment("error_count")
+        return False
+
+    recordFile(output_path)
+    extraction_stats.increment("html_pages_downloaded")
+    log.stage("html").advance()
+    log.debug(f"      ✓ Saved: {filename}")
+    return True
+
+
+def offlinePageView(course_view, item):
+    """The exported wiki page behind a Page module item, when the offline renderer can draw it."""
+    if offline_renderer is None or item.content_type != "Page":
+        return None
+
+    slug = module_page_index.get(item.id)
+    for page_view in course_view.pages:
+        if page_view.url == slug if slug else page_view.title == item.title:
+            return page_view
+    return None
+
+
+def _discussionPosts(discussion_view):
+    """The posts of an announcement or discussion in thread order, for the offline renderer."""
+    def meta(post):
+        return " · ".join(str(part) for part in (post.author, post.posted_date) if part)
+
+    posts = [(meta(discussion_view), discussion_view.body, 0)]
+    for entry in discussion_view.topic_entries:
+        posts.append((meta(entry), entry.body, 1))
+        for reply in entry.topic_replies:
+            posts.append((meta(reply), reply.body, 2))
+    return posts
+
+
 def downloadCourseModulePages(api_url, course_view, cookies_path, verbose=False): 
     pages_saved = 0
-    if not cookies_path or not course_view.modules or stop_html_downloads:
+    if not (cookies_path or offline_renderer) or not course_view.modules:
         return pages_saved
 
     modules_dir = os.path.join(DL_LOCATION, course_view.term,
@@ -1105,7 +2316,7 @@ def downloadCourseModulePages(api_url, course_view, cookies_path, verbose=False)
     # Downloads the modules page
     module_list_path = os.path.join(modules_dir, "modules_list.html")
     list_url = f"{api_url}/courses/{course_view.course_id}/modules/"
-    if _download_page_if_not_exists(list_url, module_list_path, cookies_path, verbose=verbose):
+    if cookies_path and _download_page_if_not_exists(list_url, module_list_path, cookies_path, verbose=verbose):
         pages_saved += 1
 
     for module in course_view.modules:
@@ -1117,13 +2328,18 @@ def downloadCourseModulePages(api_url, course_view, cookies_path, verbose=False)
             if item.url:
                 filename = makeValidFilename(str(item.title)) + ".html"
                 module_item_path = os.path.join(items_dir, filename)
-                if _download_page_if_not_exists(item.url, module_item_path, cookies_path, verbose=verbose):
+                page_view = offlinePageView(course_view, item)
+                if page_view is not None:
+                    if _render_offline_if_not_exists(module_item_path, page_view.title,
+                                                     [(f"Last updated {page_view.last_updated_date}", page_view.body, 0)]):
+                        pages_saved += 1
+                elif cookies_path and _download_page_if_not_exists(item.url, module_item_path, cookies_path, verbose=verbose):
                     pages_saved += 1
     return pages_saved
 
 def downloadCourseAnnouncementPages(api_url, course_view, cookies_path, verbose=False):
     pages_saved = 0
-    if not cookies_path or not course_view.announcements or stop_html_downloads:
+    if not (cookies_path or offline_renderer) or not course_view.announcements:
         return pages_saved
 
     base_announce_dir = os.path.join(DL_LOCATION, course_view.term,
@@ -1132,7 +2348,7 @@ def downloadCourseAnnouncementPages(api_url, course_view, cookies_path, verbose=
     # Download announcement list
     announcement_list_path = os.path.join(base_announce_dir, "announcement_list.html")
     list_url = f"{api_url}/courses/{course_view.course_id}/announcements/"
-    if _download_page_if_not_exists(list_url, announcement_list_path, cookies_path, verbose=verbose):
+    if cookies_path and _download_page_if_not_exists(list_url, announcement_list_path, cookies_path, verbose=verbose):
         pages_saved += 1
 
     for announcement in course_view.announcements:
@@ -1143,8 +2359,13 @@ def downloadCourseAnnouncementPages(api_url, course_view, cookies_path, verbose=
         announcements_title = shortenFileName(announcements_title, len(announcements_title) - MAX_FOLDER_NAME_SIZE)
         announce_dir = os.path.join(base_announce_dir, announcements_title)
 
-        if not os.path.exists(announce_dir):
-            os.makedirs(announce_dir)
+        ensureDirectory(announce_dir)
+
+        if offline_renderer is not None:
+            # Every entry is already in the view, so one file holds the whole thread
+            if _render_offline_if_not_exists(os.path.join(announce_dir, "announcement_1.html"), announcement.title, _discussionPosts(announcement)):
+                pages_saved += 1
+            continue
 
         for i in range(announcement.amount_pages):
             filename = f"announcement_{i+1}.html"
@@ -1156,7 +2377,7 @@ def downloadCourseAnnouncementPages(api_url, course_view, cookies_path, verbose=
         
 def downloadCourseDiscussionPages(api_url, course_view, cookies_path, verbose=False):
     pages_saved = 0
-    if not cookies_path or not course_view.discussions or stop_html_downloads:
+    if not (cookies_path or offline_renderer) or not course_view.discussions:
         return pages_saved
 
     base_discussion_dir = os.path.join(DL_LOCATION, course_view.term,
@@ -1165,7 +2386,7 @@ def downloadCourseDiscussionPages(api_url, course_view, cookies_path, verbose=Fa
     # Download discussion list
     discussion_list_path = os.path.join(base_discussion_dir, "discussion_list.html")
     list_url = f"{api_url}/courses/{course_view.course_id}/discussion_topics/"
-    if _download_page_if_not_exists(list_url, discussion_list_path, cookies_path, verbose=verbose):
+    if cookies_path and _download_page_if_not_exists(list_url, discussion_list_path, cookies_path, verbose=verbose):
         pages_saved += 1
 
     for discussion in course_view.discussions:
@@ -1176,8 +2397,13 @@ def downloadCourseDiscussionPages(api_url, course_view, cookies_path, verbose=Fa
         discussion_title = shortenFileName(discussion_title, len(discussion_title) - MAX_FOLDER_NAME_SIZE)
         discussion_dir = os.path.join(base_discussion_dir, discussion_title)
 
-        if not os.path.exists(discussion_dir):
-            os.makedirs(discussion_dir)
+        ensureDirectory(discussion_dir)
+
+        if offline_renderer is not None:
+            # Every entry is already in the view, so one file holds the whole thread
+            if _render_offline_if_not_exists(os.path.join(discussion_dir, "discussion_1.html"), discussion.title, _discussionPosts(discussion)):
+                pages_saved += 1
+            continue
 
         for i in range(discussion.amount_pages):
             filename = f"discussion_{i+1}.html"
@@ -1187,45 +2413,212 @@ def downloadCourseDiscussionPages(api_url, course_view, cookies_path, verbose=Fa
                 pages_saved += 1
     return pages_saved
 
-if __name__ == "__main__":
+def browserCaptureEnabled():
+    """Whether SingleFile snapshots are taken, which needs both --singlefile and a cookies file."""
+    return bool(COOKIES_PATH and args.singlefile) and export_filter.wants("html")
 
-    print("Welcome to the Canvas Student Data Export Tool\n")
 
-    parser = argparse.ArgumentParser(description="Export nearly all of a student's Canvas LMS data.")
-    parser.add_argument("-c", "--config", default="credentials.yaml", help="Path to YAML credentials file (default: credentials.yaml)")
-    parser.add_argument("-o", "--output", default="./output", help="Directory to store exported data (default: ./output)")
-    parser.add_argument("--singlefile", action="store_true", help="Enable HTML snapshot capture with SingleFile.")
-    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output for debugging.")
-    parser.add_argument("--version", action="version", version="Canvas Student Data Export Tool 1.0")
+def htmlCaptureEnabled():
+    """Whether HTML snapshots are taken at all, through SingleFile, the offline renderer or both."""
+    return browserCaptureEnabled() or (offline_renderer is not None and export_filter.wants("html"))
 
-    args = parser.parse_args()
 
-    # Load credentials from YAML
-    creds = _load_credentials(args.config)
+def captureCourseHTML(course_view):
+    """Capture every HTML snapshot of a course and return how many pages were saved."""
+    html_pages_saved = 0
+    # Pages the offline renderer cannot draw still need the browser
+    cookies_path = COOKIES_PATH if args.singlefile else ""
+
+    if cookies_path:
+        log.info("  Downloading course home page")
+        html_pages_saved += downloadCourseHomePageHTML(API_URL, course_view, cookies_path, verbose=args.verbose)
+
+        log.info("  Downloading course grades")
+        html_pages_saved += downloadCourseGradesHTML(API_URL, course_view, cookies_path, verbose=args.verbose)
+
+        log.info("  Downloading assignment pages")
+        html_pages_saved += downloadAssignmentPages(API_URL, course_view, cookies_path, verbose=args.verbose)
+
+    log.info("  Downloading course module pages")
+    html_pages_saved += downloadCourseModulePages(API_URL, course_view, cookies_path, verbose=args.verbose)
+
+    log.info("  Downloading course announcements pages")
+    html_pages_saved += downloadCourseAnnouncementPages(API_URL, course_view, cookies_path, verbose=args.verbose)   
+
+    log.info("  Downloading course discussion pages")
+    html_pages_saved += downloadCourseDiscussionPages(API_URL, course_view, cookies_path, verbose=args.verbose)
+
+    return html_pages_saved
+
+
+def exportCourse(course):
+    """Fetch, download and export everything for one course and return its view."""
+    html_pages_saved_in_course = 0
+
+    course_view = getCourseView(course)
+
+    if sqlite_exporter:
+        sqlite_exporter.write_course(course_view)
+
+    # Submission attachments were queued for download while assignments were fetched
+    if export_filter.wants("files"):
+        log.info("  Downloading all files")
+        downloadCourseFiles(course, course_view)
+
+    if export_filter.wants("modules"):
+        log.info("  Getting modules and downloading module files")
+        course_view.modules = fetchWithFallback("module",
+                                                lambda: findCourseModulesGraphQL(course, course_view),
+                                                lambda: findCourseModules(course, course_view))
+
+        if sqlite_exporter:
+            sqlite_exporter.write_modules(course_view.course_id, course_view.modules)
+
+    if htmlCaptureEnabled():
+        html_pages_saved_in_course += captureCourseHTML(course_view)
+
+    log.info("  Waiting for file downloads to finish")
+    download_pipeline.drain()
+    download_manifest.save()
+
+    log.info("  Exporting all course data")
+    exportAllCourseData(course_view)
+
+    # Show mini-summary for this course
+    assignments_count = len(course_view.assignments)
+    submissions_count = sum(len(a.submissions) for a in course_view.assignments)
+    modules_count = len(course_view.modules)
+    pages_count = len(course_view.pages)
+    announcements_count = len(course_view.announcements)
+    discussions_count = len(course_view.discussions)
+
+    log.info(f"  ✓ Course data exported:")
+    log.info(f"    • {assignments_count} assignments with {submissions_count} submissions (JSON)")
+    log.info(f"    • {modules_count} modules (JSON)")
+    log.info(f"    • {pages_count} pages (JSON)")
+    log.info(f"    • {announcements_count} announcements (JSON)")
+    log.info(f"    • {discussions_count} discussions (JSON)")
+    if htmlCaptureEnabled():
+        log.info(f"    • {html_pages_saved_in_course} HTML snapshots saved")
+    log.info()
+
+    return course_view
+
+
+def writeCombinedOutput(all_courses_views):
+    """Write the data of every exported course into all_output.json."""
+    import jsonpickle
+
+    log.info("Exporting data from all courses combined as one file: "
+          "all_output.json")
+    json_str = jsonpickle.encode(all_courses_views, unpicklable=False, indent=4)
+
+    all_output_path = writeJSONOutput(os.path.join(DL_LOCATION, "all_output.json"), json_str)
     
-    # Validate credentials
+    extraction_stats.increment("json_files_created")
+    log.info(f"Combined JSON data exported to: {all_output_path}")
+
+
+def writeShardStats():
+    """Write this shard's extraction counters next to its partial all_output.json for --merge."""
+    stats_path = os.path.join(DL_LOCATION, "export_stats.json")
+    with open(stats_path, "w") as out_file:
+        json.dump({"shard": args.shard, "stats": extraction_stats.__getstate__()}, out_file, indent=4)
+    log.info(f"Shard statistics written to: {stats_path}")
+
+
+def _shardDirectories(paths):
+    """Expand each path to the shard output trees it holds (itself, or its shard-i-of-N children)."""
+    shard_dirs = []
+    for path in paths:
+        if find_existing(os.path.join(path, "all_output.json")):
+            shard_dirs.append(path)
+        elif os.path.isdir(path):
+            shard_dirs.extend(sorted(entry.path for entry in os.scandir(path)
+                                     if entry.is_dir() and re.fullmatch(r"shard-\d+-of-\d+", entry.name)
+                                     and find_existing(os.path.join(entry.path, "all_output.json"))))
+    return shard_dirs
+
+
+def mergeShards(paths, output_dir):
+    """
+    Combine the partial outputs of a sharded export into one all_output.json in
+    output_dir and print the combined statistics. Course folders stay in their
+    shard trees. Returns False if there was nothing to merge.
+    """
+    shard_dirs = _shardDirectories(paths)
+    if not shard_dirs:
+        log.error(f"Error: no shard output (all_output.json) found in: {', '.join(paths)}")
+        return False
+
+    all_courses = []
+    seen_courses = set()
+    seen_shards = set()
+    shard_count = None
+    combined_stats = ExtractionStats()
+
+    for shard_dir in shard_dirs:
+        log.info(f"Merging {shard_dir}")
+        courses = json.loads(read_text(find_existing(os.path.join(shard_dir, "all_output.json"))))
+
+        for course in courses:
+            if course.get("course_id") in seen_courses:
+                log.warning(f"  Warning: course {course.get('course_id')} appears in more than one shard; keeping the first copy")
+                continue
+            seen_courses.add(course.get("course_id"))
+            all_courses.append(course)
+
+        stats_path = os.path.join(shard_dir, "export_stats.json")
+        if os.path.exists(stats_path):
+            with open(stats_path, "r", encoding="utf-8") as in_file:
+                shard_stats = json.load(in_file)
+            combined_stats.add(shard_stats.get("stats", {}))
+            if shard_stats.get("shard"):
+                index, shard_count = parseShard(shard_stats["shard"])
+                seen_shards.add(index)
+        else:
+            log.warning(f"  Warning: {stats_path} is missing; its statistics are not included")
+
+    if shard_count is not None:
+        missing = sorted(set(range(1, shard_count + 1)) - seen_shards)
+        if missing:
+            log.warning(f"Warning: shard(s) {', '.join(map(str, missing))} of {shard_count} were not merged")
+
+    # Shards finish in any order; course id order keeps the merged file stable
+    all_courses.sort(key=lambda course: course.get("course_id") or 0)
+
+    os.makedirs(output_dir, exist_ok=True)
+    all_output_path = writeJSONOutput(os.path.join(output_dir, "all_output.json"), json.dumps(all_courses, indent=4))
+    combined_stats.increment("json_files_created")
+
+    log.info(f"\nMerged {len(all_courses)} courses from {len(shard_dirs)} shards into: {all_output_path}")
+    log.info(combined_stats.summary(output_dir, singlefile_enabled=combined_stats.html_pages_downloaded > 0))
+    log.info("Note: course folders and per-course JSON files remain in the shard directories.")
+
+    return True
+
+
+def validateCredentials(creds, singlefile_enabled=False):
+    """Return the names of required credential fields that are missing."""
     required = ["API_URL", "API_KEY", "USER_ID"]
     missing = [k for k in required if not creds.get(k)]
 
     # COOKIES_PATH is required if singlefile is active, but it can be missing.
-    if args.singlefile:
-        print("Note: --singlefile is enabled. Please ensure your browser cookies")
-        print("      are fresh by logging into Canvas and then re-exporting")
-        print("      them using the chrome extension right before running this script.\n")
-        input("Press Enter to continue...")
-        if "COOKIES_PATH" not in creds or not creds["COOKIES_PATH"]:
-            missing.append("COOKIES_PATH")
+    if singlefile_enabled and not creds.get("COOKIES_PATH"):
+        missing.append("COOKIES_PATH")
 
-    if missing:
-        print(f"Error: {args.config} is missing required field(s): {', '.join(missing)}.")
-        print("Please create the YAML file with the following structure:\n"
-              "API_URL: https://<your>.instructure.com\n"
-              "API_KEY: <your key>\n"
-              "USER_ID: 123456\n"
-              "COOKIES_PATH: path/to/cookies.txt\n")
-        sys.exit(1)
+    return missing
+
+
+def configureAccount(creds, output_dir):
+    """
+    Point the module-level account state at one set of credentials and output
+    root, resetting everything a previous account in this process left behind.
+    """
+    global API_URL, API_KEY, USER_ID, COOKIES_PATH, COURSES_TO_SKIP, DL_LOCATION
+    global extraction_stats, stop_html_downloads, output_index, course_file_index, authorization_cache, download_manifest
+    global export_filter, circuit_breaker, graphql_client, offline_renderer, log
 
-    # Populate globals expected throughout the script
     API_URL = creds["API_URL"].strip().rstrip('/')
     API_KEY = creds["API_KEY"].strip()  # Remove leading/trailing whitespace which is a common issue
     USER_ID = creds["USER_ID"]
@@ -1233,14 +2626,32 @@ if __name__ == "__main__":
     COOKIES_PATH = creds.get("COOKIES_PATH", "")
     COURSES_TO_SKIP = creds.get("COURSES_TO_SKIP", [])
 
-    chrome_path_override = creds.get("CHROME_PATH")
-    if chrome_path_override:
-        override_chrome_path(chrome_path_override)
+    # An account without CHROME_PATH gets the detected browser, not the previous account's
+    override_chrome_path(creds.get("CHROME_PATH") or "")
 
     # Update output directory
-    DL_LOCATION = args.output
+    DL_LOCATION = output_dir
+
+    extraction_stats = ExtractionStats()
+    stop_html_downloads = False
+    output_index = None
+    course_file_index = {}
+    authorization_cache = AuthorizationCache()
+    download_manifest = None
+    export_filter = ExportFilter(args.include, args.exclude, args.term, args.exclude_term, args.updated_since,
+                                 parseShard(args.shard) if args.shard else None)
+    circuit_breaker = CircuitBreaker(args.circuit_threshold, args.circuit_cooldown)
+    graphql_client = None
+    offline_renderer = None
+    log.close()
+    log = ExportLog(verbose=args.verbose, live=not args.no_progress)
+
 
-    print("\nConnecting to Canvas…\n")
+def connectCanvas():
+    """Create a Canvas client for the configured account and check the API key."""
+    from canvasapi import Canvas
+
+    log.info("\nConnecting to Canvas…\n")
 
     # Initialize a new Canvas object
     canvas = Canvas(API_URL, API_KEY)
@@ -1248,108 +2659,854 @@ if __name__ == "__main__":
     # Test the connection and API key
     try:
         user = canvas.get_current_user()
-        print(f"Successfully authenticated as: {user.name} (ID: {user.id})")
+        log.info(f"Successfully authenticated as: {user.name} (ID: {user.id})")
         if user.id != USER_ID:
-            print(f"Warning: Authenticated user ID ({user.id}) does not match configured USER_ID ({USER_ID})")
+            log.warning(f"Warning: Authenticated user ID ({user.id}) does not match configured USER_ID ({USER_ID})")
     except Exception as e:
         error_type, message = CanvasErrorHandler.handle_canvas_exception(
             e, "Canvas authentication"
         )
         if CanvasErrorHandler.is_fatal_error(error_type):
-            print(f"FATAL: {message}")
+            log.error(f"FATAL: {message}")
             sys.exit(1)
         else:
             CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+
+    return canvas
+
+
+def listAccountCourses(canvas):
+    """Yield every active and completed course of the account that should be exported."""
+    skip = set(COURSES_TO_SKIP)
+
+    for enrollment_state in ("active", "completed"):
+        for course in iterPaginated(canvas.get_courses(enrollment_state=enrollment_state, include="term")):
+            if course.id in skip or not hasattr(course, "name") or not hasattr(course, "term"):
+                continue
+            if not export_filter.wants_course(course):
+                continue
+            yield course
+
+
+def exportAccount():
+    """Export every course of the account set up by configureAccount()."""
+    global sqlite_exporter, download_pipeline, authorization_cache, download_manifest, graphql_client, offline_renderer
+    global http_session
+    from http_cache import CachingSession
+
+    canvas = connectCanvas()
  
-    print(f"Creating output directory: {DL_LOCATION}\n")
+    log.info(f"Creating output directory: {DL_LOCATION}\n")
     os.makedirs(DL_LOCATION, exist_ok=True)
+
+    http_cache_session = None
+    if args.http_cache:
+        http_cache_session = CachingSession(os.path.join(DL_LOCATION, ".http_cache"),
+                                            ttl=args.http_cache_ttl,
+                                            max_bytes=args.http_cache_max_mb * 1024 * 1024)
+        canvas._Canvas__requester._session = http_cache_session
+
+    if args.backend == "graphql":
+        graphql_client = CanvasGraphQL(canvas)
+
+    # Remember forbidden endpoints for this account across runs
+    authorization_cache = AuthorizationCache(os.path.join(DL_LOCATION, ".authorization_cache.json"), USER_ID,
+                                             load=not args.reset_authorization_cache)
+    if args.reset_authorization_cache:
+        authorization_cache.save()
+
+    download_manifest = DownloadManifest(DL_LOCATION)
+
+    sqlite_exporter = None
+    if args.sqlite is not None:
+        sqlite_path = args.sqlite or os.path.join(DL_LOCATION, "export.db")
+        log.info(f"Writing SQLite database to: {sqlite_path}\n")
+        sqlite_exporter = SQLiteExporter(sqlite_path)
  
     all_courses_views = []
 
-    print("Getting list of all courses\n")
-    courses_list = [
-        canvas.get_courses(enrollment_state = "active", include="term"),
-        canvas.get_courses(enrollment_state = "completed", include="term")
-    ]
+    download_pipeline = DownloadPipeline(args.download_workers)
+    if http_session is None:
+        http_session = createHttpSession(args.download_workers * args.chunk_workers)
+    # Connections are shared between accounts, cookies are not
+    http_session.cookies.clear()
 
-    skip = set(COURSES_TO_SKIP)
+    if args.offline_html:
+        offline_renderer = OfflineRenderer(http_session, API_URL, API_KEY)
+
+    asset_store = None
+    if args.shared_assets and COOKIES_PATH and args.singlefile:
+        asset_store = AssetStore(os.path.join(DL_LOCATION, "snapshot_assets"))
+    set_asset_store(asset_store)
+    set_snapshot_compression(snapshotCompression())
 
+    log.info("Getting list of all courses\n")
 
-    if COOKIES_PATH and args.singlefile:
-        print("  Downloading course list page")
+    if browserCaptureEnabled():
+        log.info("  Downloading course list page")
         downloadCourseHTML(API_URL, COOKIES_PATH, verbose=args.verbose)
 
-    for courses in courses_list:
-        for course in courses:
-            if course.id in skip or not hasattr(course, "name") or not hasattr(course, "term"):
+    try:
+        for course in listAccountCourses(canvas):
+            all_courses_views.append(exportCourse(course))
+            log.stage("courses").advance()
+    finally:
+        # Batch workers are reused for the next account even when this one fails
+        download_pipeline.shutdown()
+        download_manifest.close()
+        if sqlite_exporter:
+            sqlite_exporter.close()
+
+    log.info("\nProgress by stage:")
+    log.report_progress()
+
+    writeCombinedOutput(all_courses_views)
+
+    if sqlite_exporter:
+        log.info(f"SQLite database written to: {sqlite_exporter.path}")
+
+    if http_cache_session is not None:
+        log.info(http_cache_session.summary())
+
+    if graphql_client is not None:
+        log.info(f"GraphQL backend: {graphql_client.queries} queries")
+
+    if offline_renderer is not None:
+        log.info(f"Offline HTML: {offline_renderer.images_inlined} images embedded")
+
+    if asset_store is not None:
+        log.info(asset_store.summary())
+
+    for line in circuit_breaker.summary():
+        log.info(f"Circuit breaker: {line}")
+
+    log.info("\nProcess complete. All canvas data exported!")
+    log.info(extraction_stats.summary(DL_LOCATION, singlefile_enabled=args.singlefile or args.offline_html))
+    log.flush()
+
+    if args.shard:
+        writeShardStats()
+
+    return all_courses_views
+
+
+def _listingRequests(count):
+    # An empty listing still costs one request
+    return max(1, -(-count // PAGE_SIZE))
+
+
+def planCourse(course):
+    """
+    Walk only the listings of one course and estimate what a full export of it
+    would transfer: file bytes, API requests and SingleFile captures. Nothing is
+    downloaded and no output is written.
+    """
+    from canvasapi.exceptions import Forbidden, Unauthorized
+
+    plan = {
+        "course_id": course.id,
+        "name": str(course.name),
+        "term": courseTermName(course),
+        "files": 0,
+        "bytes": 0,
+        "unknown_sizes": 0,
+        "requests": 0,
+        "html_captures": 0,
+        "errors": 0,
+    }
+
+    def addDownload(size):
+        plan["files"] += 1
+        plan["requests"] += 1
+        if size is None:
+            plan["unknown_sizes"] += 1
+        else:
+            plan["bytes"] += size
+
+    def listing(description, fetch):
+        try:
+            items = list(iterPaginated(fetch()))
+        except Exception as e:
+            error_type, message = CanvasErrorHandler.handle_canvas_exception(e, description)
+            if error_type != "student_limitation":
+                CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+            plan["errors"] += 1
+            plan["requests"] += 1
+            return []
+        plan["requests"] += _listingRequests(len(items))
+        return items
+
+    # HTML captures follow captureCourseHTML(): SingleFile takes every page it
+    # can reach, the offline renderer only wiki pages and discussion threads
+    browser = browserCaptureEnabled()
+    offline = bool(args.offline_html) and export_filter.wants("html")
+
+    # Homepage and grades
+    if browser:
+        plan["html_captures"] += 2
+
+    # Course files: one folder lookup and one transfer each
+    course_files = {}
+    if export_filter.wants("files") and not authorization_cache.is_forbidden(course.id, AuthorizationCache.COURSE_FILES):
+        for file in listing("course file listing", course.get_files):
+            course_files[file.id] = file
+            if export_filter.is_recent(getattr(file, "updated_at", None), getattr(file, "created_at", None)):
+                plan["requests"] += 1
+                addDownload(getattr(file, "size", None))
+
+    # Assignments, submissions and their attachments
+    if export_filter.wants("assignments"):
+        assignments = {assignment.id: assignment for assignment in listing("assignment listing", course.get_assignments)}
+
+        def fetchSubmissions():
+            if not authorization_cache.is_forbidden(course.id, AuthorizationCache.CLASS_SUBMISSIONS):
+                try:
+                    return list(iterPaginated(course.get_multiple_submissions(student_ids=["all"])))
+                except (Unauthorized, Forbidden):
+                    # Like findCourseSubmissions(), fall back to this user's own submissions
+                    authorization_cache.record_forbidden(course.id, AuthorizationCache.CLASS_SUBMISSIONS)
+                    plan["requests"] += 1
+            return course.get_multiple_submissions(student_ids=[USER_ID])
+
+        submissions = listing("submission listing", fetchSubmissions) if assignments else []
+
+        course_submissions = {}
+        for submission in submissions:
+            course_submissions.setdefault(getattr(submission, "assignment_id", None), []).append(submission)
+        assignments = {assignment_id: assignment for assignment_id, assignment in assignments.items()
+                       if isRecentAssignment(assignment, course_submissions)}
+
+        if assignments and browser:
+            plan["html_captures"] += 1  # assignment list
+            plan["html_captures"] += sum(1 for assignment in assignments.values() if getattr(assignment, "html_url", None))
+
+        for assignment_id, assignment in assignments.items():
+            for submission in course_submissions.get(assignment_id, []):
+                if export_filter.wants("attachments"):
+                    for attachment in getattr(submission, "attachments", None) or []:
+                        addDownload(getattr(attachment, "size", None))
+                if not browser:
+                    continue
+                if getattr(submission, "preview_url", None):
+                    plan["html_captures"] += 1
+
+                # Earlier attempts are captured one page each
+                attempt = getattr(submission, "attempt", None) or 0
+                if attempt > 1 and getattr(assignment, "submissions_download_url", None):
+                    plan["html_captures"] += attempt
+
+    # Modules, with their items inline
+    modules = listing("module listing", lambda: course.get_modules(include=["items"])) if export_filter.wants("modules") else []
+    if modules and browser:
+        plan["html_captures"] += 1  # module list
+    for module in modules:
+        try:
+            items = list(getModuleItems(module))
+        except Exception:
+            plan["errors"] += 1
+            continue
+        if not isinstance(getattr(module, "items", None), list):
+            plan["requests"] += _listingRequests(len(items))
+        for item in items:
+            if getattr(item, "html_url", None):
+                # Wiki pages are rendered from their exported body, everything else needs the browser
+                if offline and getattr(item, "type", None) == "Page" and export_filter.wants("pages"):
+                    plan["html_captures"] += 1
+                elif browser:
+                    plan["html_captures"] += 1
+            if getattr(item, "type", None) == "File" and export_filter.wants("files"):
+                module_file = course_files.get(getattr(item, "content_id", None))
+                if module_file is None:
+                    plan["requests"] += 1  # file lookup
+                addDownload(getattr(module_file, "size", None) if module_file is not None else None)
+
+    # Announcements and discussions: entries, one reply listing per entry, and the paged HTML view
+    for kind, fetch in (
+        ("announcements", lambda: course.get_discussion_topics(only_announcements=True)),
+        ("discussions", course.get_discussion_topics),
+    ):
+        if not export_filter.wants(kind):
+            continue
+        topics = list(filter(isRecentTopic, listing(f"{kind[:-1]} listing", fetch)))
+        if topics and browser:
+            plan["html_captures"] += 1  # list page
+        for topic in topics:
+            entries = getattr(topic, "discussion_subentry_count", 0) or 0
+            if entries > 0:
+                plan["requests"] += _listingRequests(entries) + entries
+            if getattr(topic, "html_url", None):
+                # The offline renderer puts a whole thread in one file
+                if offline:
+                    plan["html_captures"] += 1
+                elif browser:
+                    plan["html_captures"] += int(entries / 50) + 1
+
+    # Pages are listed, then fetched one by one for their bodies
+    if export_filter.wants("pages"):
+        pages = listing("page listing", course.get_pages)
+        plan["requests"] += sum(1 for page in pages if export_filter.is_recent(getattr(page, "updated_at", None)))
+
+    return plan
+
+
+def planAccount():
+    """
+    Estimate the size of exporting the account set up by configureAccount()
+    without downloading anything. Prints a per-course table and writes it to
+    <output>/export_plan.json. Returns the list of per-course estimates.
+    """
+    global authorization_cache
+
+    canvas = connectCanvas()
+    os.makedirs(DL_LOCATION, exist_ok=True)
+
+    # Use what earlier runs learned about forbidden endpoints, but do not change it
+    authorization_cache = AuthorizationCache(os.path.join(DL_LOCATION, ".authorization_cache.json"), USER_ID,
+                                             read_only=True, load=not args.reset_authorization_cache)
+
+    log.info("Planning export (listings only, nothing is downloaded)\n")
+
+    plans = []
+    for course in listAccountCourses(canvas):
+        log.info(f"  Listing {course.name}")
+        plans.append(planCourse(course))
+
+    totals = {key: sum(plan[key] for plan in plans)
+              for key in ("files", "bytes", "unknown_sizes", "requests", "html_captures", "errors")}
+    # The course listings themselves and the course list page
+    totals["requests"] += 2
+    if browserCaptureEnabled():
+        totals["html_captures"] += 1
+
+    log.info()
+    log.info(f"{'Course ID':>10}  {'Files':>6}  {'Size':>10}  {'Requests':>8}  {'HTML':>5}  Course")
+    for plan in plans:
+        log.info(f"{plan['course_id']:>10}  {plan['files']:>6}  {format_bytes(plan['bytes']):>10}  "
+              f"{plan['requests']:>8}  {plan['html_captures']:>5}  {plan['term']} / {plan['name']}")
+    log.info(f"{'Total':>10}  {totals['files']:>6}  {format_bytes(totals['bytes']):>10}  "
+          f"{totals['requests']:>8}  {totals['html_captures']:>5}  {len(plans)} courses")
+
+    if totals["unknown_sizes"]:
+        log.info(f"\nNote: {totals['unknown_sizes']} files did not report a size and are not included in the total.")
+    if totals["errors"]:
+        log.info(f"Note: {totals['errors']} listings could not be read; their content is not included.")
+    if not (COOKIES_PATH and args.singlefile) and not args.offline_html:
+        log.info("HTML captures are only taken with --singlefile or --offline-html.")
+
+    plan_path = os.path.join(DL_LOCATION, "export_plan.json")
+    with open(plan_path, "w") as out_file:
+        json.dump({"courses": plans, "totals": totals}, out_file, indent=4)
+    log.info(f"\nExport plan written to: {plan_path}")
+
+    return plans
+
+
+# In --watch mode every course is polled at least this often (in cycles), even
+# when neither the course list nor the activity stream summary changed; page
+# edits, for example, never show up in the activity stream.
+WATCH_FULL_POLL_EVERY = 4
+
+
+def _utcTimestamp():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def pollCourse(course):
+    """
+    Collect the cheap change signals of one course, one listing request per kind:
+    updated_at per assignment and page, and updated_at/last_reply_at/entry count
+    per discussion and announcement. Returns {kind: {key: (signature, object)}}.
+    """
+    from canvasapi.exceptions import Forbidden, ResourceDoesNotExist, Unauthorized
+
+    polled = {"assignments": {}, "discussions": {}, "announcements": {}, "pages": {}}
+
+    def collect(kind, fetch, key, signature):
+        if not export_filter.wants(kind):
+            return
+        try:
+            for item in iterPaginated(fetch()):
+                if key(item) is not None:
+                    polled[kind][key(item)] = (signature(item), item)
+        except (ResourceDoesNotExist, Unauthorized, Forbidden):
+            # Disabled for this course or hidden from this account, as in the initial export
+            polled[kind] = {}
+
+    collect("assignments", course.get_assignments, lambda assignment: assignment.id,
+            lambda assignment: getattr(assignment, "updated_at", None))
+
+    def topicSignature(topic):
+        return (getattr(topic, "updated_at", None), getattr(topic, "last_reply_at", None),
+                getattr(topic, "discussion_subentry_count", 0))
+
+    collect("discussions", course.get_discussion_topics, lambda topic: topic.id, topicSignature)
+    collect("announcements", lambda: course.get_discussion_topics(only_announcements=True),
+            lambda topic: topic.id, topicSignature)
+
+    collect("pages", course.get_pages, lambda page: str(page.url) if hasattr(page, "url") else None,
+            lambda page: getattr(page, "updated_at", None))
+
+    return polled
+
+
+def _signatures(polled):
+    return {kind: {key: signature for key, (signature, _) in items.items()} for kind, items in polled.items()}
+
+
+def _changedKeys(polled, previous, kind):
+    return [key for key, (signature, _) in polled[kind].items() if previous.get(kind, {}).get(key) != signature]
+
+
+def _mergeViews(current_keys, existing_views, rebuilt, key=lambda view: view.id):
+    """Rebuild a view list in listing order, preferring freshly rebuilt views."""
+    existing = {key(view): view for view in existing_views}
+    return [rebuilt.get(k, existing.get(k)) for k in current_keys if k in rebuilt or k in existing]
+
+
+def _removeSnapshots(directory, filenames=None, prefix=None):
+    """Delete stale HTML snapshots in directory (and one level below) so they are captured again."""
+    if not os.path.isdir(directory):
+        return
+    for dirpath in [directory] + [entry.path for entry in os.scandir(directory) if entry.is_dir()]:
+        for entry in os.scandir(dirpath):
+            if not entry.is_file():
                 continue
-            
-            html_pages_saved_in_course = 0
+            name = entry.name
+            for suffix in SUFFIXES.values():
+                name = name.removesuffix(suffix)
+            if (filenames and name in filenames) or (prefix and name.startswith(prefix) and name.endswith(".html")):
+                os.remove(entry.path)
+
 
-            course_view = getCourseView(course)
+def _snapshotFolder(title):
+    folder = makeValidFilename(str(title))
+    return shortenFileName(folder, len(folder) - MAX_FOLDER_NAME_SIZE)
 
-            all_courses_views.append(course_view)
 
-            print("  Downloading all files")
-            downloadCourseFiles(course, course_view)
+def refreshCourse(course, course_view, previous, since):
+    """
+    Re-fetch only the entities of a course whose change signals moved since the
+    previous poll, then rewrite its JSON (and SQLite rows and HTML snapshots).
+    Returns (new signatures, number of refreshed entities).
+    """
+    global output_index
+    from canvasapi.exceptions import Forbidden, ResourceDoesNotExist, Unauthorized
+
+    polled = pollCourse(course)
+    course_dir = os.path.join(DL_LOCATION, course_view.term, course_view.course_code)
+    refreshed = 0
+
+    # Assignments: edited ones plus those with newly graded or submitted work
+    changed_assignments = set(_changedKeys(polled, previous, "assignments"))
+    for filter_name in ("graded_since", "submitted_since") if export_filter.wants("assignments") else ():
+        changed_submissions = findCourseSubmissions(course, **{filter_name: since}) or {}
+        changed_assignments.update(key for key in changed_submissions if key in polled["assignments"])
+    removed_assignments = set(previous.get("assignments", {})) - set(polled["assignments"])
+
+    if changed_assignments or removed_assignments:
+        course_submissions = findCourseSubmissions(course) if changed_assignments else None
+        rebuilt = {}
+        for assignment_id in changed_assignments:
+            assignment_view = getAssignmentView(course, polled["assignments"][assignment_id][1], course_submissions)
+            queueAssignmentAttachments(course_view, assignment_view)
+            emitRecord("assignment", course, assignment_view, exclude=("submissions",))
+            rebuilt[assignment_id] = assignment_view
+
+        base_assign_dir = os.path.join(course_dir, "assignments")
+        for assignment_view in [a for a in course_view.assignments if a.id in rebuilt or a.id in removed_assignments] + list(rebuilt.values()):
+            _removeSnapshots(os.path.join(base_assign_dir, _snapshotFolder(assignment_view.title)), {"assignment.html", "submission.html"})
+        _removeSnapshots(base_assign_dir, {"assignment_list.html"})
+        _removeSnapshots(course_dir, {"grades.html"})
+
+        course_view.assignments = _mergeViews(list(polled["assignments"]), course_view.assignments, rebuilt)
+        refreshed += len(rebuilt) + len(removed_assignments)
+
+    # Discussions and announcements: re-walk entries only for topics with new activity
+    for kind, folder, prefix in (("discussions", "discussions", "discussion_"), ("announcements", "announcements", "announcement_")):
+        changed_topics = _changedKeys(polled, previous, kind)
+        removed_topics = set(previous.get(kind, {})) - set(polled[kind])
+        if not changed_topics and not removed_topics:
+            continue
 
-            print("  Downloading submission attachments")
-            download_submission_attachments(course, course_view)
+        rebuilt = {}
+        for topic_id in changed_topics:
+            discussion_view = getDiscussionView(polled[kind][topic_id][1], course)
+            emitRecord(kind[:-1], course, discussion_view, exclude=("topic_entries",))
+            rebuilt[topic_id] = discussion_view
+
+        base_dir = os.path.join(course_dir, folder)
+        for discussion_view in [d for d in getattr(course_view, kind) if d.id in rebuilt or d.id in removed_topics] + list(rebuilt.values()):
+            _removeSnapshots(os.path.join(base_dir, _snapshotFolder(discussion_view.title)), prefix=prefix)
+        _removeSnapshots(base_dir, {f"{prefix[:-1]}_list.html"})
+
+        setattr(course_view, kind, _mergeViews(list(polled[kind]), getattr(course_view, kind), rebuilt))
+        refreshed += len(rebuilt) + len(removed_topics)
+
+    # Pages
+    changed_pages = _changedKeys(polled, previous, "pages")
+    removed_pages = set(previous.get("pages", {})) - set(polled["pages"])
+    if changed_pages or removed_pages:
+        rebuilt = {}
+        for url in changed_pages:
+            try:
+                page = course.get_page(url)
+            except (ResourceDoesNotExist, Unauthorized, Forbidden):
+                continue  # Deleted or hidden since it was listed
+            page_view = getPageView(page)
+            emitRecord("page", course, page_view)
+            rebuilt[url] = page_view
+        # The course home page is often a wiki page
+        _removeSnapshots(course_dir, {"homepage.html"})
+        course_view.pages = _mergeViews(list(polled["pages"]), course_view.pages, rebuilt, key=lambda view: view.url)
+        refreshed += len(rebuilt) + len(removed_pages)
 
-            print("  Getting modules and downloading module files")
-            course_view.modules = findCourseModules(course, course_view)
+    if refreshed:
+        log.info(f"  {course_view.term}: {course_view.name}: {refreshed} changed entities refreshed")
 
-            if COOKIES_PATH and args.singlefile:
-                print("  Downloading course home page")
-                html_pages_saved_in_course += downloadCourseHomePageHTML(API_URL, course_view, COOKIES_PATH, verbose=args.verbose)
+        if sqlite_exporter:
+            sqlite_exporter.write_course(course_view)
 
-                print("  Downloading course grades")
-                html_pages_saved_in_course += downloadCourseGradesHTML(API_URL, course_view, COOKIES_PATH, verbose=args.verbose)
+        if htmlCaptureEnabled():
+            # Stale snapshots were removed above; capture them again
+            output_index = OutputIndex(course_dir)
+            captureCourseHTML(course_view)
 
-                print("  Downloading assignment pages")
-                html_pages_saved_in_course += downloadAssignmentPages(API_URL, course_view, COOKIES_PATH, verbose=args.verbose)
+        download_pipeline.drain()
+        download_manifest.save()
+        exportAllCourseData(course_view)
 
-                print("  Downloading course module pages")
-                html_pages_saved_in_course += downloadCourseModulePages(API_URL, course_view, COOKIES_PATH, verbose=args.verbose)
+    return _signatures(polled), refreshed
 
-                print("  Downloading course announcements pages")
-                html_pages_saved_in_course += downloadCourseAnnouncementPages(API_URL, course_view, COOKIES_PATH, verbose=args.verbose)   
 
-                print("  Downloading course discussion pages")
-                html_pages_saved_in_course += downloadCourseDiscussionPages(API_URL, course_view, COOKIES_PATH, verbose=args.verbose)
+def watchAccount(course_views, interval, since):
+    """
+    Keep an exported account up to date: every interval seconds, check the cheap
+    change signals and re-fetch only what changed. Runs until interrupted.
+    """
+    global sqlite_exporter, download_pipeline, download_manifest
+    from canvasapi import Canvas
+
+    # A dedicated client without the response cache, which would hide changes
+    canvas = Canvas(API_URL, API_KEY)
+    download_pipeline = DownloadPipeline(args.download_workers)
+    download_manifest = DownloadManifest(DL_LOCATION)
+    if args.sqlite is not None:
+        sqlite_exporter = SQLiteExporter(args.sqlite or os.path.join(DL_LOCATION, "export.db"))
+
+    views = {course_view.course_id: course_view for course_view in course_views}
+    # Submissions are asked for from each course's own last successful refresh,
+    # so a course that is skipped or fails in one cycle misses nothing
+    course_since = {course_id: since for course_id in views}
+
+    def listCourses():
+        return list(listAccountCourses(canvas))
+
+    log.info(f"\nWatching for changes every {interval} seconds (Ctrl+C to stop)\n")
+
+    # Baseline signals for everything the initial export just wrote
+    signatures = {}
+    course_updated = {}
+    for course in listCourses():
+        course_updated[course.id] = getattr(course, "updated_at", None)
+        if course.id in views:
+            try:
+                signatures[course.id] = _signatures(pollCourse(course))
+            except Exception as e:
+                error_type, message = CanvasErrorHandler.handle_canvas_exception(
+                    e, f"change check for course {course.id}"
+                )
+                CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+                extraction_stats.increment("error_count")
+    activity_summary = json.dumps(canvas.get_activity_stream_summary(), sort_keys=True)
+
+    cycle = 0
+    try:
+        while True:
+            time.sleep(interval)
+            cycle += 1
+            now = _utcTimestamp()
+            log.info(f"[{now}] Checking for changes")
+
+            changed = False
+            current_summary = json.dumps(canvas.get_activity_stream_summary(), sort_keys=True)
+            poll_all = current_summary != activity_summary or cycle % WATCH_FULL_POLL_EVERY == 0
+            activity_summary = current_summary
+
+            for course in listCourses():
+                try:
+                    if course.id not in views:
+                        log.info("  New course found")
+                        views[course.id] = exportCourse(course)
+                        signatures[course.id] = _signatures(pollCourse(course))
+                        course_since[course.id] = now
+                        changed = True
+                    elif poll_all or getattr(course, "updated_at", None) != course_updated.get(course.id):
+                        signatures[course.id], refreshed = refreshCourse(course, views[course.id], signatures.get(course.id, {}),
+                                                                         course_since.get(course.id, since))
+                        course_since[course.id] = now
+                        changed = changed or refreshed > 0
+                    course_updated[course.id] = getattr(course, "updated_at", None)
+                except Exception as e:
+                    error_type, message = CanvasErrorHandler.handle_canvas_exception(
+                        e, f"change check for course {course.id}"
+                    )
+                    CanvasErrorHandler.log_error(error_type, message, verbose=args.verbose)
+                    extraction_stats.increment("error_count")
+
+            if changed:
+                writeCombinedOutput(list(views.values()))
+            else:
+                log.info("  No changes")
+    except KeyboardInterrupt:
+        log.info("\nStopped watching.")
+    finally:
+        download_pipeline.shutdown()
+        download_manifest.close()
+        if sqlite_exporter:
+            sqlite_exporter.close()
+
+
+def _exportBatchAccount(config_path, batch_args, output_dir):
+    """
+    Batch worker: export one account into its own output root. Runs inside a
+    pool process, so the module-level account state is reset by
+    configureAccount() and stays isolated from other accounts.
+    """
+    global args, ndjson_stream
+
+    args = batch_args
+    result = {"config": config_path, "output": output_dir, "stats": {}, "elapsed": 0.0, "error": ""}
+
+    creds = _load_credentials(config_path)
+    missing = validateCredentials(creds, args.singlefile)
+    if missing:
+        result["error"] = f"missing required field(s): {', '.join(missing)}"
+        return result
+
+    os.makedirs(output_dir, exist_ok=True)
+    configureAccount(creds, output_dir)
+
+    # Output files named on the command line are created inside each account's output root
+    if args.sqlite is not None:
+        args.sqlite = os.path.join(output_dir, os.path.basename(args.sqlite) or "export.db")
+    ndjson_stream = None
+    if args.ndjson:
+        ndjson_stream = open(os.path.join(output_dir, os.path.basename(args.ndjson)), "a", encoding="utf-8")
+    if args.log_file:
+        log.open_json(os.path.join(output_dir, os.path.basename(args.log_file)))
+
+    # Keep each account's progress output in its own log instead of interleaving on the terminal
+    original_stdout = sys.stdout
+    start = time.time()
+    with open(os.path.join(output_dir, "export.log"), "w", encoding="utf-8") as log_file:
+        sys.stdout = log_file
+        try:
+            if args.plan:
+                planAccount()
+            else:
+                exportAccount()
+        except SystemExit:
+            result["error"] = "export aborted, see export.log"
+        except Exception as e:
+            result["error"] = f"export failed: {e}"
+        finally:
+            # Buffered lines belong in this account's export.log, not on the terminal
+            log.close()
+            sys.stdout = original_stdout
+            if ndjson_stream is not None:
+                ndjson_stream.close()
+                ndjson_stream = None
+
+    result["elapsed"] = time.time() - start
+    result["stats"] = extraction_stats.__getstate__()
+    return result
 
-            print("  Exporting all course data")
-            exportAllCourseData(course_view)
-            
-            # Show mini-summary for this course
-            assignments_count = len(course_view.assignments)
-            submissions_count = sum(len(a.submissions) for a in course_view.assignments)
-            modules_count = len(course_view.modules)
-            pages_count = len(course_view.pages)
-            announcements_count = len(course_view.announcements)
-            discussions_count = len(course_view.discussions)
-            
-            print(f"  ✓ Course data exported:")
-            print(f"    • {assignments_count} assignments with {submissions_count} submissions (JSON)")
-            print(f"    • {modules_count} modules (JSON)")
-            print(f"    • {pages_count} pages (JSON)")
-            print(f"    • {announcements_count} announcements (JSON)")
-            print(f"    • {discussions_count} discussions (JSON)")
-            if COOKIES_PATH and args.singlefile:
-                print(f"    • {html_pages_saved_in_course} HTML snapshots saved")
-            print()
-
-    print("Exporting data from all courses combined as one file: "
-          "all_output.json")
-    json_str = jsonpickle.encode(all_courses_views, unpicklable=False, indent=4)
 
-    all_output_path = os.path.join(DL_LOCATION, "all_output.json")
+def _batchWorkerInit(browser_slots, pool_size):
+    global http_session
 
-    with open(all_output_path, "w") as out_file:
-        out_file.write(json_str)
+    set_browser_pool(browser_slots)
+    http_session = createHttpSession(pool_size)
+
+
+def runBatch(config_paths, batch_args):
+    """
+    Export several accounts across a pool of worker processes. Each account
+    writes to <output>/<credentials file name>; SingleFile captures from all
+    workers share one pool of browser slots. Returns the number of failed accounts.
+    """
+    names = {}
+    jobs = []
+    for config_path in config_paths:
+        name = makeValidFilename(os.path.splitext(os.path.basename(config_path))[0]) or "account"
+        # Two credential files with the same name still need distinct output roots
+        names[name] = names.get(name, 0) + 1
+        if names[name] > 1:
+            name = f"{name}-{names[name]}"
+        jobs.append((config_path, os.path.join(batch_args.output, name)))
+
+    workers = max(1, min(batch_args.batch_workers, len(jobs)))
+    print(f"Exporting {len(jobs)} accounts with {workers} workers\n")
+
+    combined_stats = ExtractionStats()
+    failed = 0
+    start = time.time()
+
+    with multiprocessing.Manager() as manager:
+        browser_slots = manager.BoundedSemaphore(max(1, batch_args.browser_slots))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_batchWorkerInit,
+                                 initargs=(browser_slots, batch_args.download_workers * batch_args.chunk_workers)) as executor:
+            futures = [executor.submit(_exportBatchAccount, config_path, batch_args, output_dir)
+                       for config_path, output_dir in jobs]
+
+            for future in as_completed(futures):
+                result = future.result()
+                if result["error"]:
+                    failed += 1
+                    print(f"  ❌ {result['config']}: {result['error']}")
+                    continue
+
+                account_stats = ExtractionStats()
+                account_stats.add(result["stats"])
+                combined_stats.add(result["stats"])
+                rate = account_stats.items_processed() / result["elapsed"] if result["elapsed"] else 0
+                print(f"  ✓ {result['config']}: {account_stats.items_processed()} items in "
+                      f"{result['elapsed']:.1f}s ({rate:.1f} items/s) -> {result['output']}")
+
+    elapsed = time.time() - start
+    total_items = combined_stats.items_processed()
+    print(f"""
+Batch Summary:
+  • {len(jobs) - failed} of {len(jobs)} accounts exported
+  • {elapsed:.1f}s wall time
+  • {total_items} items ({total_items / elapsed if elapsed else 0:.1f} items/s)
+  • {combined_stats.files_downloaded + combined_stats.attachments_downloaded} files downloaded ({(combined_stats.files_downloaded + combined_stats.attachments_downloaded) / elapsed if elapsed else 0:.1f} files/s)""")
+    print(combined_stats.summary(batch_args.output + os.sep + "[Account]", singlefile_enabled=batch_args.singlefile or batch_args.offline_html))
+
+    return failed
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Export nearly all of a student's Canvas LMS data.")
+    parser.add_argument("-c", "--config", default="credentials.yaml", help="Path to YAML credentials file (default: credentials.yaml)")
+    parser.add_argument("-o", "--output", default="./output", help="Directory to store exported data (default: ./output)")
+    parser.add_argument("--singlefile", action="store_true", help="Enable HTML snapshot capture with SingleFile.")
+    parser.add_argument("--sqlite", nargs="?", const="", default=None, metavar="PATH", help="Also write all data into an indexed SQLite database (default path: <output>/export.db).")
+    parser.add_argument("--ndjson", metavar="PATH", default=None, help="Stream each assignment, submission, discussion entry, page and module item as newline-delimited JSON to PATH ('-' for stdout).")
+    parser.add_argument("--download-workers", type=int, default=4, metavar="N", help="Number of background file transfer workers (default: 4).")
+    parser.add_argument("--chunked-download-mb", type=int, default=256, metavar="MB", help="Fetch files of at least this size as parallel byte ranges; 0 disables (default: 256).")
+    parser.add_argument("--chunk-size-mb", type=int, default=32, metavar="MB", help="Size of each byte range in a chunked download (default: 32).")
+    parser.add_argument("--chunk-workers", type=int, default=4, metavar="N", help="Parallel connections per chunked download (default: 4).")
+    parser.add_argument("--backend", choices=("rest", "graphql"), default="rest", help="Fetch assignments, submissions, discussions and modules through the REST API or in batched GraphQL queries (default: rest).")
+    parser.add_argument("--shared-assets", action="store_true", help="Move the stylesheets, fonts and images inlined in every SingleFile snapshot into one shared <output>/snapshot_assets directory.")
+    parser.add_argument("--compress-html", action="store_true", help="Store HTML snapshots gzip-compressed as .html.gz.")
+    parser.add_argument("--compress-json", choices=("gzip", "zstd"), help="Store the per-course JSON files and all_output.json compressed as .json.gz or .json.zst (zstd needs the zstandard package).")
+    parser.add_argument("--offline-html", action="store_true", help="Render wiki pages, announcements and discussions from API data with embedded images, without a browser. Other pages still need --singlefile.")
+    parser.add_argument("--http-cache", action="store_true", help="Cache Canvas API responses under <output>/.http_cache to speed up repeated runs.")
+    parser.add_argument("--http-cache-ttl", type=int, default=3600, metavar="SECONDS", help="Serve cached API responses without revalidation for this long (default: 3600).")
+    parser.add_argument("--http-cache-max-mb", type=int, default=512, metavar="MB", help="Maximum size of the API response cache (default: 512).")
+    parser.add_argument("--watch", action="store_true", help="After the export, keep running and re-fetch only what changes in Canvas.")
+    parser.add_argument("--watch-interval", type=int, default=900, metavar="SECONDS", help="Seconds between change checks in --watch mode (default: 900).")
+    parser.add_argument("--batch", nargs="+", metavar="CONFIG", default=None, help="Export several accounts, one per credentials file, into <output>/<file name>.")
+    parser.add_argument("--batch-workers", type=int, default=4, metavar="N", help="Number of accounts exported in parallel in batch mode (default: 4).")
+    parser.add_argument("--browser-slots", type=int, default=2, metavar="N", help="Maximum concurrent SingleFile captures across all batch workers (default: 2).")
+    parser.add_argument("--circuit-threshold", type=int, default=5, metavar="N", help="Suspend an endpoint after N consecutive failures of the same kind; 0 disables (default: 5).")
+    parser.add_argument("--circuit-cooldown", type=int, default=300, metavar="SECONDS", help="How long a suspended endpoint is skipped before it is tried again (default: 300).")
+    parser.add_argument("--reset-authorization-cache", action="store_true", help="Forget which endpoints earlier runs found forbidden and try them again (entries also expire after a week).")
+    parser.add_argument("--include", nargs="+", choices=ExportFilter.CONTENT_TYPES, metavar="TYPE", default=None, help=f"Only export these content types ({', '.join(ExportFilter.CONTENT_TYPES)}).")
+    parser.add_argument("--exclude", nargs="+", choices=ExportFilter.CONTENT_TYPES, metavar="TYPE", default=None, help="Skip these content types.")
+    parser.add_argument("--term", action="append", metavar="NAME", default=None, help="Only export courses of this term (repeatable, case-insensitive).")
+    parser.add_argument("--exclude-term", action="append", metavar="NAME", default=None, help="Skip courses of this term (repeatable, case-insensitive).")
+    parser.add_argument("--updated-since", metavar="DATE", default=None, help="Only export files, assignments, discussions, announcements and pages changed on or after DATE (e.g. 2024-01-15).")
+    parser.add_argument("--shard", metavar="I/N", default=None, help="Export only shard I of N (courses split by id) into <output>/shard-I-of-N.")
+    parser.add_argument("--merge", nargs="+", metavar="DIR", default=None, help="Combine sharded exports (shard directories or their parent) into <output>/all_output.json and print the combined summary.")
+    parser.add_argument("--plan", action="store_true", help="Only walk the course listings and estimate download size, API requests and HTML captures; writes <output>/export_plan.json.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show a line for every file, page and module item, and tracebacks of errors.")
+    parser.add_argument("--no-progress", action="store_true", help="Do not show the live progress line on the terminal.")
+    parser.add_argument("--log-file", metavar="PATH", default=None, help="Also write every message, including per-item ones, to PATH as JSON lines.")
+    parser.add_argument("--version", action="version", version="Canvas Student Data Export Tool 1.0")
+
+    args = parser.parse_args()
+
+    if args.batch and args.ndjson == "-":
+        parser.error("--ndjson - cannot be combined with --batch; give a file name instead")
+    if args.batch and args.watch:
+        parser.error("--watch cannot be combined with --batch")
+    if args.plan and args.watch:
+        parser.error("--watch cannot be combined with --plan")
+    if args.shard:
+        try:
+            parseShard(args.shard)
+        except ValueError as e:
+            parser.error(f"--shard: {e}")
+        if args.batch:
+            parser.error("--shard cannot be combined with --batch")
+    if args.updated_since:
+        try:
+            parseTimestamp(args.updated_since)
+        except (ValueError, OverflowError):
+            parser.error(f"--updated-since: cannot parse date '{args.updated_since}'")
+    if args.compress_json == "zstd" and zstandard is None:
+        parser.error("--compress-json zstd needs the zstandard package (pip install zstandard)")
+
+    if args.ndjson == "-":
+        # Keep stdout clean for the record stream; progress messages go to stderr.
+        ndjson_stream = sys.stdout
+        sys.stdout = sys.stderr
+
+    print("Welcome to the Canvas Student Data Export Tool\n")
+
+    if args.merge:
+        sys.exit(0 if mergeShards(args.merge, args.output) else 1)
+
+    if args.singlefile and not args.plan:
+        print("Note: --singlefile is enabled. Please ensure your browser cookies")
+        print("      are fresh by logging into Canvas and then re-exporting")
+        print("      them using the chrome extension right before running this script.\n")
+        input("Press Enter to continue...")
+
+    if args.batch:
+        sys.exit(1 if runBatch(args.batch, args) else 0)
+
+    if args.ndjson and args.ndjson != "-":
+        ndjson_stream = open(args.ndjson, "a", encoding="utf-8")
+
+    # Load credentials from YAML
+    creds = _load_credentials(args.config)
     
-    extraction_stats.json_files_created += 1
-    print(f"Combined JSON data exported to: {all_output_path}")
+    # Validate credentials
+    missing = validateCredentials(creds, args.singlefile)
+
+    if missing:
+        print(f"Error: {args.config} is missing required field(s): {', '.join(missing)}.")
+        print("Please create the YAML file with the following structure:\n"
+              "API_URL: https://<your>.instructure.com\n"
+              "API_KEY: <your key>\n"
+              "USER_ID: 123456\n"
+              "COOKIES_PATH: path/to/cookies.txt\n")
+        sys.exit(1)
+
+    # Populate globals expected throughout the script
+    output_dir = args.output
+    if args.shard:
+        output_dir = os.path.join(args.output, shardDirectoryName(parseShard(args.shard)))
+    configureAccount(creds, output_dir)
+    if args.log_file:
+        log.open_json(args.log_file)
+
+    if args.plan:
+        planAccount()
+        sys.exit(0)
+
+    export_started = _utcTimestamp()
+    all_courses_views = exportAccount()
+
+    if args.watch:
+        watchAccount(all_courses_views, args.watch_interval, export_started)
+
+    log.close()
 
-    print("\nProcess complete. All canvas data exported!")
-    print(extraction_stats.summary(DL_LOCATION, singlefile_enabled=args.singlefile))
+    if ndjson_stream is not None and args.ndjson != "-":
+        ndjson_stream.close()
+        print(f"NDJSON records written to: {args.ndjson}")
@@ -0,0 +1,204 @@
+import json
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+# Console output is written in batches: when this much is pending, or every FLUSH_INTERVAL seconds
+BUFFER_BYTES = 64 * 1024
+FLUSH_INTERVAL = 0.5
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressStage:
+    """Item and byte counters of one export stage, with the rates and ETA derived from them."""
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0
+        self.items = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_total(self, count=1):
+        """Announce count more items that this stage will process."""
+        with self._lock:
+            self.total += count
+
+    def advance(self, items=1, nbytes=0):
+        with self._lock:
+            self.items += items
+            self.bytes += nbytes
+
+    def describe(self, final=False):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        items_per_second = self.items / elapsed
+
+        if final:
+            text = f"{self.name}: {self.items} items"
+            if self.bytes:
+                text += f", {format_bytes(self.bytes)}"
+            text += f" in {_format_duration(elapsed)} ({items_per_second:.1f} items/s"
+            if self.bytes:
+                text += f", {format_bytes(self.bytes / elapsed)}/s"
+            return text + ")"
+
+        text = f"{self.name} {self.items}/{self.total}" if self.total else f"{self.name} {self.items}"
+        details = [f"{items_per_second:.1f}/s"]
+        if self.bytes:
+            details.append(f"{format_bytes(self.bytes / elapsed)}/s")
+        if self.total > self.items and self.items:
+            details.append(f"ETA {_format_duration((self.total - self.items) / items_per_second)}")
+        return f"{text} ({', '.join(details)})"
+
+
+class ExportLog:
+    """
+    Leveled log for an export run.
+
+    Console lines are buffered and written in batches instead of one write per
+    message; DEBUG lines (per-item progress) only reach the console with
+    verbose. When the console is a terminal, a one-line live display of every
+    stage's items/s, bytes/s and ETA is kept at the bottom. Optionally, every
+    message of every level is also appended to a JSON-lines file.
+    """
+
+    def __init__(self, verbose=False, live=True):
+        self.verbose = verbose
+        self.live = live
+        self.stages = {}
+        self._pending = []
+        self._pending_bytes = 0
+        self._status_shown = False
+        self._json_file = None
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._flusher = None
+
+    def open_json(self, path):
+        """Also write every message, including DEBUG, to path as JSON lines."""
+        with self._lock:
+            if self._json_file is not None:
+                self._json_file.close()
+            self._json_file = open(path, "a", encoding="utf-8", buffering=1024 * 1024)
+
+    def debug(self, message, **fields):
+        self.log(DEBUG, message, **fields)
+
+    def info(self, message="", **fields):
+        self.log(INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(WARNING, message, **fields)
+
+    def error(self, message, **fields):
+        self.log(ERROR, message, **fields)
+
+    def log(self, level, message, **fields):
+        with self._lock:
+            if self._json_file is not None:
+                record = {"time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                          "level": LEVEL_NAMES[level], "message": message.strip()}
+                record.update(fields)
+                self._json_file.write(json.dumps(record, default=str) + "\n")
+
+            if level == DEBUG and not self.verbose:
+                return
+
+            line = message + "\n"
+            self._pending.append(line)
+            self._pending_bytes += len(line)
+            if self._pending_bytes >= BUFFER_BYTES or self._closed.is_set():
+                self.flush()
+
+        self._start_flusher()
+
+    def stage(self, name):
+        """The progress counters of stage name, created on first use."""
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = ProgressStage(name)
+            return self.stages[name]
+
+    def flush(self):
+        """Write pending console lines and redraw the live display."""
+        with self._lock:
+            stream = sys.stdout
+            live = self.live and self.stages and stream.isatty()
+            if not self._pending and not live:
+                return
+
+            text = "".join(self._pending)
+            self._pending = []
+            self._pending_bytes = 0
+
+            if self._status_shown:
+                # Clear the previous live line before writing above it
+                text = "\r\033[K" + text
+                self._status_shown = False
+            if live:
+                width = shutil.get_terminal_size((100, 20)).columns - 1
+                text += " · ".join(stage.describe() for stage in self.stages.values())[:width]
+                self._status_shown = True
+
+            stream.write(text)
+            stream.flush()
+
+    def report_progress(self):
+        """Log a final line per stage: items, bytes, time taken and average rates."""
+        with self._lock:
+            stages = list(self.stages.values())
+        for stage in stages:
+            self.info(f"  {stage.describe(final=True)}")
+        with self._lock:
+            self.stages = {}
+            self.flush()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self.flush()
+            if self._status_shown:
+                sys.stdout.write("\r\033[K")
+                sys.stdout.flush()
+                self._status_shown = False
+            if self._json_file is not None:
+                self._json_file.close()
+                self._json_file = None
+
+    def _start_flusher(self):
+        if self._flusher is not None or self._closed.is_set():
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, name="log-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(FLUSH_INTERVAL):
+            self.flush()
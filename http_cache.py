@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Only Canvas REST API responses are cached; file downloads and everything else
+# pass straight through.
+CACHEABLE_PATH = "/api/v1/"
+
+
+class CachingSession(requests.Session):
+    """
+    requests.Session that keeps successful Canvas API GET responses on disk.
+
+    Entries are keyed by URL, query parameters and the access token. A fresh
+    entry (younger than ttl seconds) is served without touching the network; a
+    stale one is revalidated with If-None-Match / If-Modified-Since and reused
+    when Canvas answers 304. The cache is capped at max_bytes, evicting the
+    least recently used entries first.
+    """
+
+    def __init__(self, cache_dir, ttl=3600, max_bytes=512 * 1024 * 1024):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sizes = {}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith(".body"):
+                self._sizes[entry.name[:-len(".body")]] = entry.stat().st_size
+
+    def get(self, url, **kwargs):
+        if CACHEABLE_PATH not in url or kwargs.get("stream"):
+            return super().get(url, **kwargs)
+
+        key = self._key(url, kwargs.get("params"), kwargs.get("headers"))
+        meta = self._load_meta(key)
+
+        if meta is not None and time.time() - meta["stored_at"] < self.ttl:
+            response = self._load_response(key, meta)
+            if response is not None:
+                self._count("hits")
+                return response
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if meta is not None:
+            if meta["headers"].get("ETag"):
+                headers["If-None-Match"] = meta["headers"]["ETag"]
+            if meta["headers"].get("Last-Modified"):
+                headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+        response = super().get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            cached = self._load_response(key, meta)
+            if cached is not None:
+                meta["stored_at"] = time.time()
+                self._write_meta(key, meta)
+                self._count("revalidated")
+                return cached
+            # The body vanished underneath us; fetch it again unconditionally
+            for header in ("If-None-Match", "If-Modified-Since"):
+                headers.pop(header, None)
+            response = super().get(url, headers=headers, **kwargs)
+
+        self._count("misses")
+        if response.status_code == 200:
+            self._store(key, response)
+        return response
+
+    def summary(self):
+        with self._lock:
+            return f"HTTP cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} fetched"
+
+    def _count(self, counter):
+        # Prefetch threads share the session with the main thread
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _key(self, url, params, headers):
+        digest = hashlib.sha256()
+        digest.update(url.encode("utf-8"))
+        if params:
+            items = params.items() if isinstance(params, dict) else params
+            for name, value in sorted((str(name), str(value)) for name, value in items):
+                digest.update(f"\0{name}={value}".encode("utf-8"))
+        # Different tokens may see different data, so they never share entries
+        authorization = (headers or {}).get("Authorization", "")
+        digest.update(b"\0" + authorization.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def _load_meta(self, key):
+        try:
+            with open(self._path(key, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key, meta):
+        with open(self._path(key, ".json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def _load_response(self, key, meta):
+        body_path = self._path(key, ".body")
+        try:
+            with open(body_path, "rb") as f:
+                body = f.read()
+            # Touch the entry so eviction sees it as recently used
+            os.utime(body_path)
+        except OSError:
+            return None
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.url = meta["url"]
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
+
+    def _store(self, key, response):
+        meta = {
+            "url": response.url,
+            "stored_at": time.time(),
+            "headers": {name: value for name, value in response.headers.items()
+                        if name.lower() not in ("set-cookie", "content-encoding", "transfer-encoding")},
+        }
+        body = response.content
+
+        with self._lock:
+            with open(self._path(key, ".body"), "wb") as f:
+                f.write(body)
+            self._write_meta(key, meta)
+            self._sizes[key] = len(body)
+            self._evict()
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        def last_used(key):
+            try:
+                return os.path.getmtime(self._path(key, ".body"))
+            except OSError:
+                return 0
+
+        # Drop least recently used entries until we are back under 90% of the cap
+        for key in sorted(self._sizes, key=last_used):
+            if total <= self.max_bytes * 0.9:
+                break
+            for suffix in (".body", ".json"):
+                try:
+                    os.remove(self._path(key, suffix))
+                except OSError:
+                    pass
+            total -= self._sizes.pop(key)
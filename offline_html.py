@@ -0,0 +1,113 @@
+import base64
+import threading
+from html import escape
+from urllib.parse import urljoin
+
+from canvas_auth import auth_headers
+
+# Images larger than this stay linked instead of being embedded
+MAX_INLINE_BYTES = 10 * 1024 * 1024
+
+STYLE = """
+body { font-family: "Lato", "Helvetica Neue", Arial, sans-serif; color: #2d3b45; max-width: 56rem; margin: 2rem auto; padding: 0 1rem; line-height: 1.5; }
+h1 { font-size: 1.75rem; border-bottom: 1px solid #c7cdd1; padding-bottom: .5rem; }
+.post { border: 1px solid #c7cdd1; border-radius: 4px; padding: .75rem 1rem; margin: 1rem 0; }
+.meta { color: #6b7780; font-size: .875rem; margin-bottom: .5rem; }
+img { max-width: 100%; height: auto; }
+table { border-collapse: collapse; }
+td, th { border: 1px solid #c7cdd1; padding: .25rem .5rem; }
+"""
+
+
+class OfflineRenderer:
+    """
+    Builds self-contained HTML files from content the Canvas API already
+    returned (wiki page bodies, announcements, discussions), so no browser is
+    needed to capture them. Referenced images are fetched once through the
+    given session and embedded as data URIs.
+    """
+
+    def __init__(self, session, base_url, access_token=""):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.access_token = access_token
+        self.images_inlined = 0
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def render(self, title, posts):
+        """
+        Return a complete HTML document. posts is a list of (meta, body_html,
+        depth) tuples rendered in order, each indented by its depth.
+        """
+        parts = [
+            "<!DOCTYPE html>",
+            '<html><head><meta charset="utf-8">',
+            f"<title>{escape(title)}</title>",
+            f"<style>{STYLE}</style>",
+            "</head><body>",
+            f"<h1>{escape(title)}</h1>",
+        ]
+        for meta, body, depth in posts:
+            parts.append(f'<div class="post" style="margin-left: {2 * depth}rem">')
+            if meta:
+                parts.append(f'<div class="meta">{escape(meta)}</div>')
+            parts.append(f'<div class="content">{body or ""}</div>')
+            parts.append("</div>")
+        parts.append("</body></html>")
+
+        return self.inline_images("\n".join(parts))
+
+    def inline_images(self, html):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        for img in soup.find_all("img", src=True):
+            data_uri = self._data_uri(img)
+            if data_uri:
+                img["src"] = data_uri
+                # The embedded copy is the only one that works offline
+                for attribute in ("srcset", "data-api-endpoint", "data-api-returntype"):
+                    if attribute in img.attrs:
+                        del img[attribute]
+        return str(soup)
+
+    def _data_uri(self, img):
+        src = img["src"]
+        if src.startswith("data:"):
+            return None
+
+        url = urljoin(self.base_url + "/", src)
+        with self._lock:
+            if url in self._images:
+                return self._images[url]
+
+        data_uri = None
+        try:
+            # Canvas marks embedded course files with their API endpoint, whose
+            # download URL works with the access token alone
+            download_url = url
+            if img.get("data-api-returntype") == "File" and img.get("data-api-endpoint"):
+                endpoint = img["data-api-endpoint"]
+                response = self.session.get(endpoint, headers=auth_headers(endpoint, self.base_url, self.access_token), timeout=30)
+                if response.ok:
+                    download_url = response.json().get("url") or url
+
+            with self.session.get(download_url, headers=auth_headers(download_url, self.base_url, self.access_token), stream=True, timeout=30) as response:
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+                if response.ok and content_type.startswith("image/"):
+                    content = bytearray()
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        content.extend(chunk)
+                        if len(content) > MAX_INLINE_BYTES:
+                            break
+                    else:
+                        data_uri = f"data:{content_type};base64,{base64.b64encode(content).decode('ascii')}"
+        except Exception:
+            data_uri = None  # Leave the original link in place
+
+        with self._lock:
+            self._images[url] = data_uri
+            if data_uri:
+                self.images_inlined += 1
+        return data_uri
@@ -1,9 +1,16 @@
 from subprocess import CalledProcessError, run
+import base64
+import hashlib
+import mimetypes
 import os
 import platform
+import re
 import shutil
+import threading
 import time
 
+from compressed_io import compress_file, find_existing, read_text
+
 if platform.system() == "Windows":
     SINGLEFILE_BINARY_PATH = os.path.join("node_modules", ".bin", "single-file.cmd")
 else:
@@ -45,13 +52,123 @@ def _detect_chrome_path() -> str:
 
 
 # Mutable global – can be overridden at runtime by export.py
-CHROME_PATH = _detect_chrome_path()
+DETECTED_CHROME_PATH = _detect_chrome_path()
+CHROME_PATH = DETECTED_CHROME_PATH
 
 
 def override_chrome_path(path: str):
-    """Allow callers to override the detected Chrome path at runtime."""
+    """Allow callers to override the detected Chrome path at runtime; an empty path restores the detected one."""
     global CHROME_PATH
-    CHROME_PATH = path.strip()
+    CHROME_PATH = path.strip() or DETECTED_CHROME_PATH
+
+# Optional semaphore limiting how many browsers run at once. export.py's batch
+# mode shares one across all of its worker processes.
+BROWSER_SLOTS = None
+
+
+def set_browser_pool(semaphore):
+    """Share a semaphore that bounds concurrent SingleFile captures."""
+    global BROWSER_SLOTS
+    BROWSER_SLOTS = semaphore
+
+# Inlined base64 data URIs, as SingleFile writes them into attributes and CSS url()s
+DATA_URI_PATTERN = re.compile(r"data:([\w.+-]+/[\w.+-]+)(?:;[\w.+-]+=[\w.+-]+)*;base64,([A-Za-z0-9+/]+={0,2})")
+
+
+class AssetStore:
+    """
+    Content-addressed directory shared by all snapshots of an export. Every
+    SingleFile capture inlines the same Canvas stylesheets, fonts and images;
+    extract() moves those data URIs into the store once, under the SHA-256 of
+    their content, and points the snapshot at the stored copy with a relative
+    path so it still opens straight from disk.
+    """
+
+    def __init__(self, root, min_bytes=1024):
+        self.root = root
+        self.min_bytes = min_bytes
+        self.assets_stored = 0
+        self.references_rewritten = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def extract(self, html_path):
+        with open(html_path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        html_dir = os.path.dirname(os.path.abspath(html_path))
+        stored_bytes = 0
+        rewritten = 0
+
+        def replace(match):
+            nonlocal stored_bytes, rewritten
+            if len(match.group(0)) < self.min_bytes:
+                return match.group(0)
+            try:
+                data = base64.b64decode(match.group(2), validate=True)
+            except ValueError:
+                return match.group(0)
+
+            asset_path, created = self._store(data, match.group(1))
+            if created:
+                stored_bytes += len(data)
+            rewritten += 1
+            return os.path.relpath(asset_path, html_dir).replace(os.sep, "/")
+
+        rewritten_content = DATA_URI_PATTERN.sub(replace, content)
+        if not rewritten:
+            return 0
+
+        tmp_path = html_path + ".part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(rewritten_content)
+        os.replace(tmp_path, html_path)
+
+        saved = len(content.encode("utf-8")) - len(rewritten_content.encode("utf-8")) - stored_bytes
+        with self._lock:
+            self.references_rewritten += rewritten
+            self.bytes_saved += saved
+        return saved
+
+    def summary(self):
+        return (f"Shared snapshot assets: {self.assets_stored} stored, {self.references_rewritten} "
+                f"references rewritten, {self.bytes_saved / (1024 * 1024):.1f} MB saved")
+
+    def _store(self, data, mime_type):
+        """Write data into the store unless it is already there; returns (path, created)."""
+        digest = hashlib.sha256(data).hexdigest()
+        extension = mimetypes.guess_extension(mime_type) or "." + re.sub(r"[^a-z0-9]", "", mime_type.split("/")[1].split("+")[0])
+        asset_path = os.path.join(self.root, digest[:2], digest + extension)
+
+        with self._lock:
+            if os.path.exists(asset_path):
+                return asset_path, False
+            os.makedirs(os.path.dirname(asset_path), exist_ok=True)
+            tmp_path = asset_path + ".part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, asset_path)
+            self.assets_stored += 1
+        return asset_path, True
+
+
+# Optional AssetStore that every successful capture is passed through
+ASSET_STORE = None
+
+
+def set_asset_store(store):
+    """Deduplicate the inlined assets of every following capture into store (None disables)."""
+    global ASSET_STORE
+    ASSET_STORE = store
+
+# Compression ("gzip") applied to every successful capture; None keeps plain .html files
+SNAPSHOT_COMPRESSION = None
+
+
+def set_snapshot_compression(compression):
+    """Store every following capture compressed, as <name>.gz for "gzip" (None disables)."""
+    global SNAPSHOT_COMPRESSION
+    SNAPSHOT_COMPRESSION = compression
 
 def addQuotes(str):
     return "\"" + str.strip("\"") + "\""
@@ -80,16 +197,22 @@ def download_page(url, cookies_path, output_path, output_name_template = "", add
         if verbose:
             print(f"    Executing: {cmd}")
         
-        proc = run(cmd, shell=True, check=True, capture_output=True)
+        if BROWSER_SLOTS is not None:
+            with BROWSER_SLOTS:
+                proc = run(cmd, shell=True, check=True, capture_output=True)
+        else:
+            proc = run(cmd, shell=True, check=True, capture_output=True)
         
         # Check if the downloaded page is a login page
         # Retry logic to handle file locking race condition on Windows
+        snapshot_path = os.path.join(output_path, output_name_template)
         max_retries = 3
         retry_delay = 0.1 # seconds
         for attempt in range(max_retries):
             try:
-                with open(os.path.join(output_path, output_name_template), "r", encoding="utf-8") as f:
-                    content = f.read()
+                # Look at whatever name the page ended up under, compressed or not
+                saved_path = find_existing(snapshot_path) or snapshot_path
+                content = read_text(saved_path)
 
                 # More robust login page detection logic
                 login_indicators = [
@@ -100,9 +223,12 @@ def download_page(url, cookies_path, output_path, output_name_template = "", add
 
                 if any(indicator in content for indicator in login_indicators):
                     # Clean up the invalid file
-                    os.remove(os.path.join(output_path, output_name_template))
+                    os.remove(saved_path)
                     raise Exception("Authentication failed, downloaded a login page. Please update your cookies.")
 
+                if ASSET_STORE is not None:
+                    ASSET_STORE.extract(snapshot_path)
+
                 # If we succeed, break the loop
                 break
 
@@ -118,6 +244,9 @@ def download_page(url, cookies_path, output_path, output_name_template = "", add
                     # caller can handle it.
                     raise
 
+        if SNAPSHOT_COMPRESSION:
+            compress_file(snapshot_path, SNAPSHOT_COMPRESSION)
+
         if verbose:
             if stdout := proc.stdout.strip():
                     print(stdout)
@@ -0,0 +1,274 @@
+import sqlite3
+
+# Normalized schema for the optional SQLite output. Every table carries the
+# owning course_id so per-course queries never need a join, and rows are keyed
+# by their Canvas id (pages by their URL within the course) so re-running an
+# export simply replaces them.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    term TEXT,
+    course_code TEXT,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    title TEXT,
+    description TEXT,
+    assigned_date TEXT,
+    due_date TEXT,
+    html_url TEXT,
+    ext_url TEXT,
+    updated_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER,
+    assignment_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    grade TEXT,
+    raw_score TEXT,
+    total_possible_points TEXT,
+    submission_comments TEXT,
+    attempt INTEGER,
+    preview_url TEXT,
+    ext_url TEXT,
+    PRIMARY KEY (assignment_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS attachments (
+    id INTEGER NOT NULL,
+    assignment_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    filename TEXT,
+    url TEXT,
+    size INTEGER,
+    updated_at TEXT,
+    PRIMARY KEY (id, assignment_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS discussions (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    is_announcement INTEGER NOT NULL DEFAULT 0,
+    title TEXT,
+    author TEXT,
+    posted_date TEXT,
+    body TEXT,
+    url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS discussion_entries (
+    id INTEGER PRIMARY KEY,
+    discussion_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    author TEXT,
+    posted_date TEXT,
+    body TEXT
+);
+
+CREATE TABLE IF NOT EXISTS discussion_replies (
+    id INTEGER PRIMARY KEY,
+    entry_id INTEGER NOT NULL,
+    discussion_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    author TEXT,
+    posted_date TEXT,
+    body TEXT
+);
+
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER,
+    course_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    body TEXT,
+    created_date TEXT,
+    last_updated_date TEXT,
+    PRIMARY KEY (course_id, url)
+);
+
+CREATE TABLE IF NOT EXISTS modules (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    name TEXT,
+    position INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS module_items (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    title TEXT,
+    content_type TEXT,
+    url TEXT,
+    external_url TEXT,
+    position INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_courses_term ON courses (term);
+CREATE INDEX IF NOT EXISTS idx_assignments_course ON assignments (course_id);
+CREATE INDEX IF NOT EXISTS idx_submissions_course_grade ON submissions (course_id, grade);
+CREATE INDEX IF NOT EXISTS idx_submissions_user ON submissions (user_id);
+CREATE INDEX IF NOT EXISTS idx_attachments_course ON attachments (course_id);
+CREATE INDEX IF NOT EXISTS idx_discussions_course ON discussions (course_id, is_announcement);
+CREATE INDEX IF NOT EXISTS idx_entries_discussion ON discussion_entries (discussion_id);
+CREATE INDEX IF NOT EXISTS idx_replies_entry ON discussion_replies (entry_id);
+CREATE INDEX IF NOT EXISTS idx_pages_course ON pages (course_id);
+CREATE INDEX IF NOT EXISTS idx_modules_course ON modules (course_id);
+CREATE INDEX IF NOT EXISTS idx_module_items_module ON module_items (module_id);
+CREATE INDEX IF NOT EXISTS idx_module_items_course_type ON module_items (course_id, content_type);
+"""
+
+# Tables that hold course content (as opposed to module data) and are rebuilt
+# from a course view on every write.
+COURSE_CONTENT_TABLES = (
+    "assignments",
+    "submissions",
+    "attachments",
+    "discussions",
+    "discussion_entries",
+    "discussion_replies",
+    "pages",
+)
+
+
+class SQLiteExporter:
+    """Write course views into a normalized, indexed SQLite database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def _columns(self, table):
+        return {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+
+    def _migrate(self):
+        """Bring a database written by an older version up to the current schema."""
+        # Pages used to have no key; their rows come back when each course is exported again
+        if self._columns("pages") and "url" not in self._columns("pages"):
+            self.conn.execute("DROP TABLE pages")
+        attachment_columns = self._columns("attachments")
+        if attachment_columns:
+            if "size" not in attachment_columns:
+                self.conn.execute("ALTER TABLE attachments ADD COLUMN size INTEGER")
+            if "updated_at" not in attachment_columns:
+                self.conn.execute("ALTER TABLE attachments ADD COLUMN updated_at TEXT")
+
+    def write_course(self, course_view):
+        """
+        Replace everything stored for this course (except modules) with the
+        contents of course_view. Runs in a single transaction so an interrupted
+        export never leaves a half-written course behind.
+        """
+        course_id = course_view.course_id
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO courses (id, term, course_code, name) VALUES (?, ?, ?, ?)",
+                (course_id, course_view.term, course_view.course_code, course_view.name),
+            )
+
+            for table in COURSE_CONTENT_TABLES:
+                self.conn.execute(f"DELETE FROM {table} WHERE course_id = ?", (course_id,))
+
+            for assignment in course_view.assignments:
+                self._insert_assignment(course_id, assignment)
+
+            for announcement in course_view.announcements:
+                self._insert_discussion(course_id, announcement, is_announcement=True)
+
+            for discussion in course_view.discussions:
+                self._insert_discussion(course_id, discussion, is_announcement=False)
+
+            for page in course_view.pages:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO pages (id, course_id, url, title, body, created_date, last_updated_date) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (page.id, course_id, page.url, page.title, page.body, page.created_date, page.last_updated_date),
+                )
+
+    def write_modules(self, course_id, module_views):
+        """Replace the modules and module items stored for this course."""
+        with self.conn:
+            self.conn.execute("DELETE FROM modules WHERE course_id = ?", (course_id,))
+            self.conn.execute("DELETE FROM module_items WHERE course_id = ?", (course_id,))
+
+            for module_position, module in enumerate(module_views):
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO modules (id, course_id, name, position) VALUES (?, ?, ?, ?)",
+                    (module.id, course_id, module.name, module_position),
+                )
+                for item_position, item in enumerate(module.items):
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO module_items "
+                        "(id, module_id, course_id, title, content_type, url, external_url, position) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (item.id, module.id, course_id, item.title, item.content_type,
+                         item.url, item.external_url, item_position),
+                    )
+
+    def close(self):
+        self.conn.close()
+
+    def _insert_assignment(self, course_id, assignment):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO assignments "
+            "(id, course_id, title, description, assigned_date, due_date, html_url, ext_url, updated_url) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (assignment.id, course_id, assignment.title, assignment.description, assignment.assigned_date,
+             assignment.due_date, assignment.html_url, assignment.ext_url, assignment.updated_url),
+        )
+
+        for submission in assignment.submissions:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO submissions "
+                "(id, assignment_id, course_id, user_id, grade, raw_score, total_possible_points, "
+                "submission_comments, attempt, preview_url, ext_url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (submission.id, assignment.id, course_id, submission.user_id, submission.grade,
+                 submission.raw_score, submission.total_possible_points, submission.submission_comments,
+                 submission.attempt, submission.preview_url, submission.ext_url),
+            )
+
+            for attachment in submission.attachments:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO attachments "
+                    "(id, assignment_id, course_id, user_id, filename, url, size, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (attachment.id, assignment.id, course_id, submission.user_id, attachment.filename, attachment.url,
+                     attachment.size, attachment.updated_at),
+                )
+
+    def _insert_discussion(self, course_id, discussion, is_announcement):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO discussions "
+            "(id, course_id, is_announcement, title, author, posted_date, body, url) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (discussion.id, course_id, int(is_announcement), discussion.title, discussion.author,
+             discussion.posted_date, discussion.body, discussion.url),
+        )
+
+        for entry in discussion.topic_entries:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO discussion_entries (id, discussion_id, course_id, author, posted_date, body) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.id, discussion.id, course_id, entry.author, entry.posted_date, entry.body),
+            )
+
+            for reply in entry.topic_replies:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO discussion_replies "
+                    "(id, entry_id, discussion_id, course_id, author, posted_date, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (reply.id, entry.id, discussion.id, course_id, reply.author, reply.posted_date, reply.body),
+                )